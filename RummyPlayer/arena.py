@@ -0,0 +1,183 @@
+"""
+Headless self-play arena.
+
+Deals and plays two-player hands in-process, making every decision through the same
+functions the /draw/ and /lay-down/ handlers use (main4.choose_draw, main4.choose_lay_down
+and main4.finalize_discard, with a CardTracker per player fed the same events), and
+spreads games over a process pool. Reports win rate, score and per-decision latency for
+each side.
+
+Rules: 10 cards each, one card turned up to start the discard pile. Each turn a player
+draws from the stock or takes the top discard, then melds and discards. Melded cards
+leave the hand. A player who empties their hand wins the hand and scores the opponent's
+deadwood. If the stock runs out, the lower deadwood wins the difference.
+
+Run from the RummyPlayer directory, e.g.:
+    python arena.py --games 2000 --workers 4 --a exact:ev --b mcts:meld --budget 0.01
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import CARD_INDEX, CARD_NAMES, cards_to_mask, deadwood, mask_to_cards
+import main4
+from tracker import CardTracker
+
+HAND_SIZE = 10
+MAX_TURNS = 200
+
+
+def parse_player(spec):
+    """
+    "lay_down_mode:draw_mode", e.g. "mcts:ev" -> {"lay_down": "mcts", "draw": "ev"}.
+    A player dict may also carry "weights" (evaluator weights its searches use); players
+    without them use main4's current weights.
+    """
+    lay_down, _, draw = spec.partition(":")
+    return {"lay_down": lay_down or "mcts", "draw": draw or "ev"}
+
+
+def play_hand(players, seed, time_budget, first=0):
+    """
+    Plays one hand. Returns (winner index or None for a tie, score, latencies) where
+    latencies is {"draw": [[...], [...]], "lay_down": [[...], [...]]} in seconds per player.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    deck = CARD_NAMES[:]
+    rng.shuffle(deck)
+    hands = [sorted(deck[:HAND_SIZE]), sorted(deck[HAND_SIZE:2 * HAND_SIZE])]
+    stock = deck[2 * HAND_SIZE:]
+    discard = deque([stock.pop()])
+    trackers = [CardTracker(cards_to_mask(h)) for h in hands]   # what each player knows
+    for tracker in trackers:
+        tracker.discarded(CARD_INDEX[discard[0]], by_opponent=False)
+    tables = [{}, {}]            # per-player MCTS tables, as a GameSession keeps them
+    latencies = {"draw": [[], []], "lay_down": [[], []]}
+    weights = [p.get("weights", main4.learning_weights) for p in players]
+    turn = first
+    for _ in range(MAX_TURNS):
+        if not stock:
+            break
+        me, hand = turn, hands[turn]
+        started = time.perf_counter()
+        take = main4.choose_draw(hand, discard, mode=players[me]["draw"], unseen=trackers[me].unseen)
+        latencies["draw"][me].append(time.perf_counter() - started)
+        if take:
+            card = discard.popleft()
+            trackers[me].we_take(CARD_INDEX[card])
+            trackers[1 - me].opponent_takes(CARD_INDEX[card])
+            forbidden = card
+        else:
+            card = stock.pop()
+            trackers[me].we_draw(CARD_INDEX[card])
+            forbidden = None
+        hand.append(card)
+
+        main4.set_learning_weights(weights[me])
+        started = time.perf_counter()
+        final_state = main4.choose_lay_down(hand, mode=players[me]["lay_down"],
+                                            forbidden_discard=forbidden, time_budget=time_budget,
+                                            table=tables[me], unseen=trackers[me].unseen,
+                                            opponent=trackers[me].opponent)
+        final_state = main4.finalize_discard(final_state, trackers[me], hand, forbidden)
+        latencies["lay_down"][me].append(time.perf_counter() - started)
+        trackers[me].laid_down(final_state["remaining"], final_state["discard"])
+        if final_state["discard"] is not None:
+            discard.appendleft(CARD_NAMES[final_state["discard"]])
+            trackers[1 - me].discarded(final_state["discard"], by_opponent=True)
+        hands[me] = hand = sorted(mask_to_cards(final_state["remaining"]))
+        if not hand:
+            return me, deadwood(cards_to_mask(hands[1 - me])), latencies
+        turn = 1 - me
+    points = [deadwood(cards_to_mask(h)) for h in hands]
+    if points[0] == points[1]:
+        return None, 0, latencies
+    winner = 0 if points[0] < points[1] else 1
+    return winner, points[1 - winner] - points[winner], latencies
+
+
+def play_batch(players, seeds, time_budget):
+    """
+    Plays one hand per seed, alternating who starts; runs inside a pool worker.
+    """
+    results = []
+    for i, seed in enumerate(seeds):
+        results.append(play_hand(players, seed, time_budget, first=i % 2))
+    return results
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_arena(players, games, workers=1, seed=432, time_budget=0.01, batch_size=25):
+    """
+    Plays `games` hands across `workers` processes and returns a summary dict.
+    """
+    # Pin every player's weights now, so weights one player sets in a worker never leak
+    # into the other player's searches.
+    players = [dict(p, weights=p.get("weights", main4.learning_weights)) for p in players]
+    seeds = [seed + i for i in range(games)]
+    batches = [seeds[i:i + batch_size] for i in range(0, games, batch_size)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_batch, players, batch, time_budget) for batch in batches]
+        results = [result for future in futures for result in future.result()]
+    elapsed = time.perf_counter() - started
+
+    wins, scores = [0, 0], [0, 0]
+    latencies = {"draw": [[], []], "lay_down": [[], []]}
+    for winner, score, hand_latencies in results:
+        if winner is not None:
+            wins[winner] += 1
+            scores[winner] += score
+        for kind, per_player in hand_latencies.items():
+            for me in (0, 1):
+                latencies[kind][me].extend(per_player[me])
+    return {
+        "games": games,
+        "elapsed": elapsed,
+        "wins": wins,
+        "ties": games - sum(wins),
+        "scores": scores,
+        "latencies": latencies,
+    }
+
+
+def print_summary(names, summary):
+    games = summary["games"]
+    print(f"{games} hands in {summary['elapsed']:.1f} s ({games / summary['elapsed']:.1f} hands/s), "
+          f"{summary['ties']} tied")
+    for me, name in enumerate(names):
+        print(f"{name:>12}: win rate {summary['wins'][me] / games:6.1%}  "
+              f"score {summary['scores'][me]:7d}")
+        for kind in ("draw", "lay_down"):
+            values = summary["latencies"][kind][me]
+            if values:
+                print(f"{'':>14}{kind:>8} p50 {statistics.median(values) * 1000:8.3f} ms  "
+                      f"p99 {percentile(values, 0.99) * 1000:8.3f} ms  ({len(values)} decisions)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Rummy self-play arena.")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=432)
+    parser.add_argument("--budget", type=float, default=0.01, help="MCTS seconds per lay-down")
+    parser.add_argument("--a", default="exact:ev", help="player A as lay_down_mode:draw_mode")
+    parser.add_argument("--b", default="mcts:meld", help="player B as lay_down_mode:draw_mode")
+    args = parser.parse_args()
+    main4.PONDER = False
+    players = [parse_player(args.a), parse_player(args.b)]
+    summary = run_arena(players, args.games, workers=args.workers, seed=args.seed,
+                        time_budget=args.budget)
+    print_summary([args.a, args.b], summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Event-processing throughput over long seeded event streams: the tokenizing
+process_events() against the original substring-scanning version.
+Run from the RummyPlayer directory:  python bench_events.py [turns] [repeats]
+"""
+import contextlib
+import os
+import random
+import sys
+import time
+
+from cards import CARD_NAMES
+from sessions import GameSession
+import main4
+
+OPPONENT = "bob"
+
+
+def legacy_process_events(state, event_text):
+    """
+    process_events() as it was before the tokenizer, over a dict of lists.
+    """
+    hand, discard = state["hand"], state["discard"]
+    for event_line in event_text.splitlines():
+        if ((main4.USER_NAME + " draws") in event_line or (main4.USER_NAME + " takes") in event_line):
+            print("In draw, hand is " + str(hand))
+            print("Drew " + event_line.split(" ")[-1])
+            drawn_card = event_line.split(" ")[-1]
+            main4.logging.info("Drew " + drawn_card + ", hand before: " + str(hand))
+            hand.append(drawn_card)
+            hand.sort()
+            print("Hand is now " + str(hand))
+            main4.logging.info("Hand is now: " + str(hand))
+        if "discards" in event_line:
+            card = event_line.split(" ")[-1]
+            discard.insert(0, card)
+        if "takes" in event_line:
+            if OPPONENT in event_line:
+                taken_card = event_line.split(" ")[-1]
+                state["opponent_discard_picks"].append(taken_card)
+                main4.logging.info("Opponent took " + taken_card + " from discard.")
+            if discard:
+                discard.pop(0)
+        if " Ends:" in event_line:
+            main4.logging.info(event_line)
+            print(event_line)
+
+
+def record_stream(turns, rng):
+    """
+    Returns (starting hand, event blocks) for a long seeded game where our hand keeps
+    growing, as it would if we melded nothing.
+    """
+    deck = CARD_NAMES[:]
+    rng.shuffle(deck)
+    hand, stock = deck[:10], deck[10:]
+    blocks = []
+    for turn in range(turns):
+        if not stock:
+            rng.shuffle(deck)
+            stock = list(deck)
+        lines = [f"{OPPONENT} draws", f"{OPPONENT} discards {stock.pop()}"]
+        if rng.random() < 0.3:
+            lines.append(f"{main4.USER_NAME} takes {stock[-1]}")
+        else:
+            lines.append(f"{main4.USER_NAME} draws {stock[-1]}")
+        lines.append(f"{main4.USER_NAME} discards {stock.pop()}")
+        if rng.random() < 0.2:
+            lines.append(f"{OPPONENT} takes {stock[-1]}")
+        blocks.append("\n".join(lines))
+    blocks.append("Hand Ends: done")
+    return hand, blocks
+
+
+def main(turns=200, repeats=50):
+    hand, blocks = record_stream(turns, random.Random(432))
+    lines = sum(block.count("\n") + 1 for block in blocks) * repeats
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            state = {"hand": sorted(hand), "discard": [], "opponent_discard_picks": []}
+            for block in blocks:
+                legacy_process_events(state, block)
+        legacy = lines / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            session = GameSession("bench", opponent_name=OPPONENT)
+            session.start_hand(hand)
+            for block in blocks:
+                main4.process_events(session, block)
+        parsed = lines / (time.perf_counter() - started)
+    assert session.hand == state["hand"] and list(session.discard) == state["discard"]
+    print(f"{lines} event lines ({turns}-turn stream x {repeats})")
+    print(f"legacy process_events : {legacy:10.0f} lines/s")
+    print(f"tokenizing parser     : {parsed:10.0f} lines/s  ({parsed / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,37 @@
+"""
+Compares the lay-down modes ("mcts" and "exact") on the same seeded hands:
+per-decision latency and the deadwood left after the chosen play.
+Run from the RummyPlayer directory:  python bench_lay_down.py [hands] [hand_size] [mcts_budget_ms]
+"""
+import random
+import statistics
+import sys
+import time
+
+from cards import CARD_NAMES, deadwood
+import main4
+
+
+def main(num_hands=200, hand_size=11, mcts_budget_ms=20):
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, hand_size) for _ in range(num_hands)]
+    results = {}
+    for mode in ("mcts", "exact"):
+        random.seed(432)
+        latencies, points = [], []
+        for hand in hands:
+            started = time.perf_counter()
+            final_state = main4.choose_lay_down(hand, mode=mode, time_budget=mcts_budget_ms / 1000)
+            latencies.append((time.perf_counter() - started) * 1000)
+            points.append(deadwood(final_state["remaining"]))
+        results[mode] = points
+        latencies.sort()
+        print(f"{mode:>5}: p50 {statistics.median(latencies):7.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:7.2f} ms  "
+              f"mean deadwood {statistics.mean(points):6.2f}")
+    worse = sum(m > e for m, e in zip(results["mcts"], results["exact"]))
+    print(f"{num_hands} hands of {hand_size} cards; mcts left more deadwood than exact on {worse}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
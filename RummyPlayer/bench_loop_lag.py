@@ -0,0 +1,49 @@
+"""
+Event-loop lag while a lay-down search runs: inline on the loop (how the handlers used to
+call mcts) versus awaited through the search executor, plus how an overload is rejected.
+Run from the RummyPlayer directory:  python bench_loop_lag.py [budget_ms] [searches]
+"""
+import asyncio
+import random
+import sys
+
+from cards import CARD_NAMES
+import main4
+
+
+async def measure(label, run_one, hands):
+    main4.loop_lag["max"] = 0.0
+    monitor = asyncio.create_task(main4.monitor_loop_lag())
+    await asyncio.sleep(0)
+    for hand in hands:
+        await run_one(hand)
+        await asyncio.sleep(main4.LOOP_LAG_INTERVAL * 2)   # let the monitor take its sample
+    monitor.cancel()
+    print(f"{label:>9}: max loop lag {main4.loop_lag['max'] * 1000:7.1f} ms")
+
+
+async def main(budget_ms=300, num_searches=3):
+    main4.LOOP_LAG_INTERVAL = 0.01
+    main4.LOOP_LAG_WARNING = float("inf")
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, 11) for _ in range(num_searches)]
+    budget = budget_ms / 1000
+
+    async def inline(hand):
+        main4.choose_lay_down(hand, time_budget=budget)
+
+    async def executor(hand):
+        await main4.run_search(main4.choose_lay_down, hand, time_budget=budget)
+
+    print(f"{num_searches} searches of {budget_ms} ms each")
+    await measure("inline", inline, hands)
+    await measure("executor", executor, hands)
+
+    burst = main4.SEARCH_QUEUE_LIMIT + 2
+    results = await asyncio.gather(*(executor(hands[0]) for _ in range(burst)), return_exceptions=True)
+    rejected = sum(isinstance(r, main4.SearchOverloaded) for r in results)
+    print(f"burst of {burst} concurrent searches: {rejected} rejected with SearchOverloaded (503)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: meld lookup through the precomputed index in cards.py against the
+original string-based get_valid_melds.
+Run from the RummyPlayer directory:  python bench_melds.py [hands] [hand_size]
+"""
+import random
+import sys
+import timeit
+
+from cards import CARD_NAMES, cards_to_mask, mask_to_cards, valid_meld_masks
+
+
+def card_value(card):
+    value = card[0]
+    if value.isdigit():
+        return int(value)
+    return {'T': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14}.get(value, 0)
+
+def legacy_get_valid_melds(cards):
+    """
+    The string/dict implementation get_valid_melds used before the meld index.
+    """
+    melds = []
+    rank_dict = {}
+    for card in cards:
+        rank_dict.setdefault(card[0], []).append(card)
+    for rank, same_rank in rank_dict.items():
+        if len(same_rank) >= 3:
+            melds.append(sorted(same_rank))
+    suit_dict = {}
+    for card in cards:
+        suit_dict.setdefault(card[1], []).append(card)
+    for suit, suit_cards in suit_dict.items():
+        sorted_cards = sorted(suit_cards, key=lambda c: card_value(c))
+        seq = [sorted_cards[0]]
+        for i in range(1, len(sorted_cards)):
+            if card_value(sorted_cards[i]) == card_value(seq[-1]) + 1:
+                seq.append(sorted_cards[i])
+            else:
+                if len(seq) >= 3:
+                    melds.append(seq.copy())
+                seq = [sorted_cards[i]]
+        if len(seq) >= 3:
+            melds.append(seq.copy())
+    return melds
+
+
+def main(num_hands=2000, hand_size=11):
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, hand_size) for _ in range(num_hands)]
+    masks = [cards_to_mask(h) for h in hands]
+
+    for h, m in zip(hands, masks):
+        expected = sorted(legacy_get_valid_melds(h))
+        assert sorted(mask_to_cards(meld) for meld in valid_meld_masks(m)) == expected, h
+
+    def run_legacy():
+        for h in hands:
+            legacy_get_valid_melds(h)
+
+    def run_index():
+        for m in masks:
+            valid_meld_masks(m)
+
+    legacy = min(timeit.repeat(run_legacy, number=1, repeat=5)) / num_hands
+    index = min(timeit.repeat(run_index, number=1, repeat=5)) / num_hands
+    print(f"{num_hands} hands of {hand_size} cards")
+    print(f"legacy get_valid_melds : {legacy * 1e6:8.2f} us/call")
+    print(f"meld index lookup      : {index * 1e6:8.2f} us/call  ({legacy / index:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
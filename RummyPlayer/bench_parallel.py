@@ -0,0 +1,38 @@
+"""
+Measures MCTS iterations per second as root-parallel workers are added.
+Run from the RummyPlayer directory:  python bench_parallel.py [max_workers] [budget_ms] [hands]
+"""
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import CARD_NAMES
+import main4
+
+
+def main(max_workers=None, budget_ms=200, num_hands=10):
+    max_workers = max_workers or os.cpu_count()
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, 11) for _ in range(num_hands)]
+    print(f"{os.cpu_count()} CPUs, {budget_ms} ms budget, {num_hands} hands")
+    baseline = None
+    for workers in sorted({1, 2, 4, 8, max_workers}):
+        if workers > max_workers:
+            continue
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(int, range(workers)))   # fork every worker before timing
+            iterations = elapsed = 0
+            for hand in hands:
+                stats = {}
+                main4.parallel_mcts(main4.make_root_state(hand), pool, workers,
+                                    time_budget=budget_ms / 1000, stats=stats)
+                iterations += stats["iterations"]
+                elapsed += stats["elapsed"]
+        rate = iterations / elapsed
+        baseline = baseline or rate
+        print(f"{workers:3d} workers: {rate:10.0f} iterations/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,102 @@
+"""
+Decision quality per MCTS iteration with and without pruned move generation and static
+rollout cutoffs (MCTS_PRUNE_MOVES, ROLLOUT_CUTOFF_DEPTH in main4.py).
+
+Every variant lays down the same seeded meld-rich hands (bench_suite's corpus: on random
+deals nearly every variant is already optimal) at a ladder of iteration counts;
+quality is the mean regret against the exact solver (reward of the exact lay-down minus
+reward of the chosen one, evaluator weights as loaded by main4) and the share of hands
+played optimally. The last table gives the iterations each variant needs to match the
+unpruned search at REFERENCE_ITERATIONS. The search only lays maximal melds, so even a
+complete search trails the exact solver on some hands; that floor is printed first.
+Run from the RummyPlayer directory:
+    python bench_pruning.py [corpora]   (CORPUS_SIZE hands each)
+"""
+import random
+import sys
+import time
+
+from bench_suite import meld_rich_hands
+from cards import cards_to_mask
+from evaluator import score_hand
+import main4
+
+LADDER = (10, 25, 50, 100, 200, 400, 800, 1600)
+REFERENCE_ITERATIONS = 1000
+# name: (MCTS_PRUNE_MOVES, ROLLOUT_CUTOFF_DEPTH)
+VARIANTS = {
+    "unpruned": (False, None),
+    "pruned, full rollouts": (True, None),
+    "pruned, cutoff 2": (True, 2),
+    "pruned, cutoff 1": (True, 1),
+    "pruned, cutoff 0": (True, 0),
+}
+
+
+def quality(hands, optimal, iterations):
+    """
+    Returns (mean regret, share optimal, microseconds per iteration) over hands.
+    """
+    random.seed(432)
+    regret = optimal_count = 0
+    started = time.perf_counter()
+    for hand, best in zip(hands, optimal):
+        root_state = main4.make_root_state(hand)
+        root = main4.mcts(root_state, iterations=iterations, suspend_gc=True)
+        chosen = main4.simulate_sequence(root_state, main4.get_best_sequence(root))
+        loss = best - score_hand(chosen["remaining"], main4.eval_weights)
+        regret += loss
+        optimal_count += loss <= 1e-9
+    elapsed = time.perf_counter() - started
+    return regret / len(hands), optimal_count / len(hands), elapsed / (iterations * len(hands)) * 1e6
+
+
+def model_optimum(remaining):
+    """
+    Best reward reachable with main4's move generation, by exhaustive search.
+    """
+    best = -1000
+    for move in main4.moves_from(remaining):
+        left, discard = main4.move_result(remaining, move)
+        if discard is not None:
+            best = max(best, score_hand(left, main4.eval_weights))
+        elif left:
+            best = max(best, model_optimum(left))
+    return best
+
+
+def main(corpora=4):
+    rng = random.Random(432)
+    hands = [hand for _ in range(corpora) for hand in meld_rich_hands(rng)]
+    count = len(hands)
+    optimal = [score_hand(main4.choose_lay_down(hand, mode="exact")["remaining"], main4.eval_weights)
+               for hand in hands]
+    floor = sum(best - model_optimum(cards_to_mask(hand)) for hand, best in zip(hands, optimal))
+    saved = main4.MCTS_PRUNE_MOVES, main4.ROLLOUT_CUTOFF_DEPTH
+    results = {}
+    try:
+        for name, (prune, cutoff) in VARIANTS.items():
+            main4.MCTS_PRUNE_MOVES, main4.ROLLOUT_CUTOFF_DEPTH = prune, cutoff
+            results[name] = {n: quality(hands, optimal, n) for n in LADDER + (REFERENCE_ITERATIONS,)}
+    finally:
+        main4.MCTS_PRUNE_MOVES, main4.ROLLOUT_CUTOFF_DEPTH = saved
+
+    print(f"{count} meld-rich hands; mean regret vs exact (share optimal), per iteration count")
+    print(f"complete search of the move model: regret {floor / count:.2f}")
+    print(f"{'variant':24s}" + "".join(f"{n:>15d}" for n in LADDER) + f"{'us/iter':>10s}")
+    for name, rows in results.items():
+        cells = "".join(f"{rows[n][0]:8.2f} ({rows[n][1]:4.0%})" for n in LADDER)
+        print(f"{name:24s}{cells}{rows[LADDER[-1]][2]:10.1f}")
+
+    target = results["unpruned"][REFERENCE_ITERATIONS][0]
+    print(f"\niterations to match unpruned at {REFERENCE_ITERATIONS} (regret {target:.2f}):")
+    for name, rows in results.items():
+        needed = next((n for n in LADDER if rows[n][0] <= target), None)
+        if needed is None:
+            print(f"  {name:24s} not reached by {LADDER[-1]}")
+        else:
+            print(f"  {name:24s} {needed:5d} iterations, {needed * rows[needed][2] / 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
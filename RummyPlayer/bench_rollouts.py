@@ -0,0 +1,53 @@
+"""
+Rollouts per second: the scalar simulate() against batched NumPy rollouts, and the
+effect of several rollouts per leaf inside mcts(). Both run the unpruned policy
+(MCTS_PRUNE_MOVES off), the only one the batched rollouts play.
+Run from the RummyPlayer directory:  python bench_rollouts.py [rollouts] [hands]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from cards import CARD_NAMES, cards_to_mask
+from rollouts import batch_rollouts, masks_to_array
+import main4
+
+
+def main(num_rollouts=20000, num_hands=20):
+    main4.MCTS_PRUNE_MOVES = False
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, 11) for _ in range(num_hands)]
+    masks = [cards_to_mask(h) for h in hands]
+    per_hand = num_rollouts // num_hands
+
+    random.seed(432)
+    started = time.perf_counter()
+    for hand in hands:
+        state = main4.make_root_state(hand)
+        for _ in range(per_hand):
+            main4.simulate(state)
+    scalar = per_hand * num_hands / (time.perf_counter() - started)
+    print(f"simulate()           : {scalar:10.0f} rollouts/s")
+
+    np_rng = np.random.default_rng(432)
+    for batch in sorted({64, 256, per_hand}):
+        started = time.perf_counter()
+        done = 0
+        for mask in masks:
+            for _ in range(max(1, per_hand // batch)):
+                batch_rollouts(np.repeat(masks_to_array([mask]), batch, axis=0), np_rng)
+                done += batch
+        rate = done / (time.perf_counter() - started)
+        print(f"batch_rollouts({batch:5d}) : {rate:10.0f} rollouts/s  ({rate / scalar:.1f}x)")
+
+    for rollouts in (1, 16, 64):
+        stats = {}
+        main4.mcts(main4.make_root_state(hands[0]), time_budget=0.5, rollouts=rollouts, stats=stats)
+        print(f"mcts rollouts={rollouts:3d}    : {stats['iterations'] / stats['elapsed']:10.0f} iterations/s, "
+              f"{stats['rollouts'] / stats['elapsed']:10.0f} rollouts/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
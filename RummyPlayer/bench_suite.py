@@ -0,0 +1,203 @@
+"""
+Benchmark suite for the player's decision hot paths.
+
+Times get_valid_melds, get_possible_moves, apply_move, simulate, mcts and a full
+/lay-down/ handler call over fixed, seeded hand corpora (easy, meld-rich and
+all-deadwood hands), reports ops/sec and p50/p99 latency, and saves the results as a
+JSON baseline. "compare" flags regressions between two saved runs.
+
+Run from the RummyPlayer directory:
+    python bench_suite.py run --out before.json
+    python bench_suite.py run --out after.json
+    python bench_suite.py compare before.json after.json --threshold 0.10
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+
+from cards import CARD_NAMES, MELDS, candidate_melds, cards_to_mask, mask_to_cards
+import main4
+
+HAND_SIZE = 11
+CORPUS_SIZE = 50
+MCTS_ITERATIONS = 300
+
+
+# -------------------- CORPORA --------------------
+
+def easy_hands(rng):
+    """
+    Random deals: mostly deadwood with the odd meld.
+    """
+    return [rng.sample(CARD_NAMES, HAND_SIZE) for _ in range(CORPUS_SIZE)]
+
+
+def meld_rich_hands(rng):
+    """
+    Two or three disjoint melds topped up with random cards.
+    """
+    hands = []
+    while len(hands) < CORPUS_SIZE:
+        mask = 0
+        for meld in rng.sample(MELDS, 3):
+            if not meld & mask and (mask | meld).bit_count() <= HAND_SIZE:
+                mask |= meld
+        if mask.bit_count() < 6:
+            continue
+        rest = [c for c in CARD_NAMES if not cards_to_mask([c]) & mask]
+        cards = mask_to_cards(mask) + rng.sample(rest, HAND_SIZE - mask.bit_count())
+        hands.append(cards)
+    return hands
+
+
+def all_deadwood_hands(rng):
+    """
+    Hands that contain no meld at all.
+    """
+    hands = []
+    while len(hands) < CORPUS_SIZE:
+        cards = rng.sample(CARD_NAMES, HAND_SIZE)
+        if not candidate_melds(cards_to_mask(cards)):
+            hands.append(cards)
+    return hands
+
+
+CORPORA = {
+    "easy": easy_hands,
+    "meld_rich": meld_rich_hands,
+    "all_deadwood": all_deadwood_hands,
+}
+
+
+# -------------------- TIMING --------------------
+
+def measure(fn, inputs, min_calls, min_seconds=0.2):
+    """
+    Calls fn on the inputs round-robin until both min_calls and min_seconds are reached.
+    Returns ops/sec and p50/p99 latency in microseconds.
+    """
+    durations = []
+    clock = time.perf_counter
+    deadline = clock() + min_seconds
+    i = 0
+    while len(durations) < min_calls or clock() < deadline:
+        arg = inputs[i % len(inputs)]
+        started = clock()
+        fn(arg)
+        durations.append(clock() - started)
+        i += 1
+    durations.sort()
+    return {
+        "calls": len(durations),
+        "ops_per_sec": len(durations) / sum(durations),
+        "p50_us": durations[len(durations) // 2] * 1e6,
+        "p99_us": durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1e6,
+    }
+
+
+def lay_down_request(loop, hand):
+    """
+    One full /lay-down/ handler call (event processing, executor hop, search, play string)
+    on a fresh game.
+    """
+    session = main4.sessions.start("bench", opponent_name="bench-opponent")
+    session.start_hand(hand[:-1])
+    event = f"{main4.USER_NAME} draws {hand[-1]}"
+    info = main4.UpdateInfo(game_id="bench", event=event)
+    return loop.run_until_complete(main4.lay_down(info))
+
+
+def run_suite(quick=False):
+    main4.PONDER = False
+    main4.lay_down_cache.enabled = False   # every lay_down_request call must search
+    main4.LAY_DOWN_MODE = "mcts"
+    main4.MCTS_ITERATIONS = MCTS_ITERATIONS
+    main4.MCTS_WORKERS = 1
+    scale = 0.2 if quick else 1.0
+    loop = asyncio.new_event_loop()
+    results = {}
+    for corpus_name, build in CORPORA.items():
+        hands = build(random.Random(432))
+        states = [main4.make_root_state(h) for h in hands]
+        moves = [(s, m) for s in states for m in main4.get_possible_moves(s)]
+        cases = {
+            "get_valid_melds": (main4.get_valid_melds, hands, 2000),
+            "get_possible_moves": (main4.get_possible_moves, states, 2000),
+            "apply_move": (lambda sm: main4.apply_move(*sm), moves, 5000),
+            "simulate": (main4.simulate, states, 2000),
+            "mcts": (lambda s: main4.mcts(s, iterations=MCTS_ITERATIONS), states, 20),
+            "lay_down_request": (lambda h: lay_down_request(loop, h), hands, 20),
+        }
+        for case_name, (fn, inputs, min_calls) in cases.items():
+            random.seed(432)
+            key = f"{case_name}/{corpus_name}"
+            results[key] = measure(fn, inputs, max(5, int(min_calls * scale)), 0.2 * scale)
+            print(f"{key:36s} {results[key]['ops_per_sec']:12.1f} ops/s  "
+                  f"p50 {results[key]['p50_us']:10.1f} us  p99 {results[key]['p99_us']:10.1f} us")
+    loop.close()
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "mcts_iterations": MCTS_ITERATIONS,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+# -------------------- COMPARISON --------------------
+
+def compare(old, new, threshold):
+    """
+    Prints old vs new per case and returns the keys that regressed: ops/sec down, or p50
+    latency up, by more than `threshold` (a fraction).
+    """
+    regressions = []
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        before, after = old["results"][key], new["results"][key]
+        speed = after["ops_per_sec"] / before["ops_per_sec"]
+        latency = after["p50_us"] / before["p50_us"]
+        regressed = speed < 1 - threshold or latency > 1 + threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:36s} ops/s {speed:6.2f}x  p50 {latency:6.2f}x  {'REGRESSION' if regressed else ''}")
+    for key in sorted(set(old["results"]) ^ set(new["results"])):
+        print(f"{key:36s} only in {'old' if key in old['results'] else 'new'} run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the player's hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the suite and save a JSON baseline")
+    run.add_argument("--out", default="bench_results.json")
+    run.add_argument("--quick", action="store_true", help="fewer calls per case")
+    diff = commands.add_parser("compare", help="flag regressions between two runs")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(quick=args.quick)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print("saved", args.out)
+        return 0
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = compare(old, new, args.threshold)
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
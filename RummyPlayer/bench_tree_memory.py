@@ -0,0 +1,53 @@
+"""
+Memory per 100k MCTS nodes and search speed with the cyclic GC running or suspended.
+Grows one shared transposition table over seeded random hands, as pondering and
+cross-turn reuse do. Run from the RummyPlayer directory:
+    python bench_tree_memory.py [nodes] [iterations_per_hand]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from cards import CARD_NAMES
+import main4
+
+
+def grow_table(hands, nodes, iterations, suspend_gc):
+    """
+    Searches hands into one table until it holds `nodes` nodes (or the hands run out).
+    Returns (table, search iterations, seconds).
+    """
+    random.seed(432)
+    table, done, started = {}, 0, time.perf_counter()
+    for hand in hands:
+        stats = {}
+        main4.mcts(main4.make_root_state(hand), iterations=iterations, table=table, stats=stats,
+                   suspend_gc=suspend_gc)
+        done += stats["iterations"]
+        if len(table) >= nodes:
+            break
+    return table, done, time.perf_counter() - started
+
+
+def main(nodes=50000, iterations=500):
+    rng = random.Random(432)
+    hands = [rng.sample(CARD_NAMES, 11) for _ in range(20000)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table, _, _ = grow_table(hands, nodes, iterations, suspend_gc=True)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{len(table)} nodes, {used / len(table) * 100000 / 2 ** 20:.1f} MiB per 100k nodes")
+    del table
+
+    for suspend_gc in (False, True):
+        table, done, elapsed = grow_table(hands, nodes, iterations, suspend_gc)
+        print(f"gc {'suspended' if suspend_gc else 'enabled  '}: {done / elapsed:10.0f} iterations/s "
+              f"({len(table)} nodes, {elapsed:.1f} s)")
+        del table
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,201 @@
+"""
+Compact card engine used by the MCTS core in main4.py.
+
+A card is an index 0..51 (suit * 13 + rank, ranks 2..A) and a hand is a single
+52-bit integer with one bit per card. Removing cards, membership tests and
+deadwood sums are bit operations; the two-character card strings the game
+server sends ("7H", "TS", ...) are only converted at the HTTP boundary.
+"""
+
+RANKS = "23456789TJQKA"
+SUITS = "CDHS"
+
+NUM_RANKS = len(RANKS)
+NUM_CARDS = NUM_RANKS * len(SUITS)
+SUIT_MASK = (1 << NUM_RANKS) - 1      # the 13 bits of one suit block
+FULL_DECK = (1 << NUM_CARDS) - 1
+
+# -------------------- PER-CARD TABLES --------------------
+
+CARD_NAMES = [rank + suit for suit in SUITS for rank in RANKS]
+CARD_INDEX = {name: i for i, name in enumerate(CARD_NAMES)}
+CARD_BITS = [1 << i for i in range(NUM_CARDS)]
+# Same values as card_value() in main4.py: 2..9 face value, T=10, J=11, Q=12, K=13, A=14.
+CARD_VALUES = [rank + 2 for suit in SUITS for rank in range(NUM_RANKS)]
+
+# Deadwood of every possible 13-bit suit block, so a whole hand costs four lookups.
+_SUIT_BLOCK_VALUES = [0] * (1 << NUM_RANKS)
+for _block in range(1, 1 << NUM_RANKS):
+    _low = _block & -_block
+    _SUIT_BLOCK_VALUES[_block] = _SUIT_BLOCK_VALUES[_block ^ _low] + _low.bit_length() + 1
+
+# -------------------- CONVERSION --------------------
+
+def cards_to_mask(cards):
+    """
+    Converts an iterable of card strings into a hand bitmask.
+    """
+    mask = 0
+    for card in cards:
+        mask |= CARD_BITS[CARD_INDEX[card]]
+    return mask
+
+def mask_to_cards(mask):
+    """
+    Converts a hand bitmask back into a list of card strings, ordered by suit then rank.
+    """
+    return [CARD_NAMES[i] for i in iter_cards(mask)]
+
+# -------------------- BIT OPERATIONS --------------------
+
+def iter_cards(mask):
+    """
+    Yields the card indices set in mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def deadwood(mask):
+    """
+    Returns the summed card values of every card in mask.
+    """
+    return (_SUIT_BLOCK_VALUES[mask & SUIT_MASK]
+            + _SUIT_BLOCK_VALUES[(mask >> 13) & SUIT_MASK]
+            + _SUIT_BLOCK_VALUES[(mask >> 26) & SUIT_MASK]
+            + _SUIT_BLOCK_VALUES[(mask >> 39) & SUIT_MASK])
+
+def nth_card(mask, n):
+    """
+    Returns the index of the n-th (0-based) card set in mask.
+    """
+    for _ in range(n):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+# -------------------- MELD INDEX --------------------
+# Every legal meld over the 52-card deck, built once at import: for each rank the four
+# 3-card sets and the 4-card set, and for each suit every run of 3..13 consecutive ranks.
+# Each index entry pairs a meld with the cards that would make it part of a larger meld
+# of the same kind. Lookups probe two indexes instead of scanning the whole table:
+# SETS_BY_RANK[rank] and RUNS_BY_LOW_CARD[card], the latter ordered by length so a scan
+# can stop at the first run that is not in the hand.
+
+SET_STRIDE = 0x8004002001             # one card of a rank in each suit (bits 13 apart)
+
+def _build_meld_index():
+    sets_by_rank = [[] for _ in range(NUM_RANKS)]
+    runs_by_low_card = [[] for _ in range(NUM_CARDS)]
+    for rank in range(NUM_RANKS):
+        full_set = SET_STRIDE << rank
+        sets_by_rank[rank].append((full_set, 0))
+        for missing in iter_cards(full_set):
+            sets_by_rank[rank].append((full_set & ~CARD_BITS[missing], CARD_BITS[missing]))
+    for suit in range(len(SUITS)):
+        base = suit * NUM_RANKS
+        for start in range(NUM_RANKS - 2):
+            for length in range(3, NUM_RANKS - start + 1):
+                ext = 0
+                if start > 0:
+                    ext |= CARD_BITS[base + start - 1]
+                if start + length < NUM_RANKS:
+                    ext |= CARD_BITS[base + start + length]
+                run = ((1 << length) - 1) << (base + start)
+                runs_by_low_card[base + start].append((run, ext))
+    melds = [meld for group in sets_by_rank + runs_by_low_card for meld, _ in group]
+    return melds, sets_by_rank, runs_by_low_card
+
+MELDS, SETS_BY_RANK, RUNS_BY_LOW_CARD = _build_meld_index()
+# Per card, the 3-card melds it belongs to: a card can extend a hand's melds only if
+# two cards of one of these are already held.
+MELD_TRIPLES_WITH_CARD = [[m for m in MELDS if m & CARD_BITS[c] and m.bit_count() == 3]
+                          for c in range(NUM_CARDS)]
+
+def candidate_melds(mask):
+    """
+    Returns every meld (maximal or not) contained in mask, as bitmasks.
+    """
+    found = []
+    for rank in range(NUM_RANKS):
+        if (mask & (SET_STRIDE << rank)).bit_count() >= 3:
+            found.extend(meld for meld, _ in SETS_BY_RANK[rank] if meld & mask == meld)
+    scan = mask
+    while scan:
+        low = scan & -scan
+        for meld, _ in RUNS_BY_LOW_CARD[low.bit_length() - 1]:
+            if meld & mask != meld:
+                break
+            found.append(meld)
+        scan ^= low
+    return found
+
+def valid_meld_masks(mask):
+    """
+    Returns the maximal melds contained in mask, as bitmasks.
+    Matches get_valid_melds(): every set holds all cards of its rank and every run
+    is a maximal stretch of consecutive ranks in one suit.
+    """
+    found = []
+    for rank in range(NUM_RANKS):
+        same_rank = mask & (SET_STRIDE << rank)
+        if same_rank.bit_count() >= 3:
+            found.append(same_rank)
+    scan = mask
+    while scan:
+        low = scan & -scan
+        for meld, ext in RUNS_BY_LOW_CARD[low.bit_length() - 1]:
+            if meld & mask != meld:
+                break
+            if not ext & mask:
+                found.append(meld)
+                break
+        scan ^= low
+    return found
+
+def can_meld_with(mask, card):
+    """
+    Returns True if card forms a meld with cards in mask.
+    """
+    bit = CARD_BITS[card]
+    for meld in MELD_TRIPLES_WITH_CARD[card]:
+        if meld & mask == meld ^ bit:
+            return True
+    return False
+
+# -------------------- SUIT ISOMORPHISM --------------------
+# Suits are interchangeable: permuting them maps sets to sets and runs to runs and keeps
+# every deadwood total. A hand is canonicalized by ordering its four 13-bit suit blocks
+# from largest to smallest, so all up-to-24 suit permutations of a hand share one key.
+# A permutation `perm` lists, for each canonical suit slot, the real suit it came from.
+
+def canonical_suits(mask):
+    """
+    Returns the permutation that puts mask's suit blocks in canonical (descending) order.
+    """
+    blocks = [(mask >> (13 * suit)) & SUIT_MASK for suit in range(4)]
+    return tuple(sorted(range(4), key=lambda suit: -blocks[suit]))
+
+def to_canonical_mask(mask, perm):
+    """
+    Maps a mask from real suits into the canonical suits of perm.
+    """
+    result = 0
+    for slot, suit in enumerate(perm):
+        result |= ((mask >> (13 * suit)) & SUIT_MASK) << (13 * slot)
+    return result
+
+def from_canonical_mask(mask, perm):
+    """
+    Maps a mask from the canonical suits of perm back to real suits.
+    """
+    result = 0
+    for slot, suit in enumerate(perm):
+        result |= ((mask >> (13 * slot)) & SUIT_MASK) << (13 * suit)
+    return result
+
+def to_canonical_card(card, perm):
+    return perm.index(card // 13) * 13 + card % 13
+
+def from_canonical_card(card, perm):
+    return perm[card // 13] * 13 + card % 13
@@ -0,0 +1,51 @@
+"""
+Bounded LRU cache of lay-down decisions.
+
+The same hand comes up again and again across hands and games. /lay-down/ looks its
+position up here before searching, and a hit is answered without touching the search
+executor.
+"""
+from collections import OrderedDict
+
+
+class DecisionCache:
+    """
+    Maps a decision key to the final state chosen for it, least recently used first.
+    max_entries: entries kept before the least recently used one is dropped.
+    enabled: when False, get() always misses and put() stores nothing.
+    """
+    def __init__(self, max_entries=10000, enabled=True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the cached decision for key, or None.
+        """
+        if not self.enabled:
+            return None
+        decision = self.entries.get(key)
+        if decision is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return decision
+
+    def put(self, key, decision):
+        if not self.enabled:
+            return
+        self.entries[key] = decision
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
@@ -0,0 +1,39 @@
+"""
+Bulk determinizations of the hidden cards for information-set MCTS ("ismcts" in main4.py).
+
+One call samples `count` complete guesses at what we cannot see: which unseen cards the
+opponent holds (always including the cards they are known to hold) and the order of the
+top of the stock. They are drawn with NumPy in one batch and stored as plain Python ints
+and lists, so the search only indexes into them, one determinization per iteration.
+"""
+import numpy as np
+
+from cards import iter_cards
+
+STOCK_DEPTH = 2      # stock cards each determinization fixes: the opponent's and our next draw
+
+
+class Determinizations:
+    """
+    opponent[i]: mask of the opponent's hand in determinization i.
+    stock[i]: the next STOCK_DEPTH stock cards (card indices) in determinization i.
+    next_values: memo the search keeps alongside, see main4.determinized_value().
+    """
+    __slots__ = ("count", "opponent", "stock", "next_values")
+
+    def __init__(self, unseen, opponent_known, count, rng, opponent_cards=10):
+        """
+        unseen: mask of cards we have not seen (the stock plus the opponent's hidden cards).
+        opponent_known: mask of cards the opponent is known to hold.
+        opponent_cards: how many cards the opponent is assumed to hold in total.
+        """
+        cards = np.fromiter(iter_cards(unseen), dtype=np.int64)
+        hidden = max(0, min(opponent_cards - opponent_known.bit_count(), cards.size - STOCK_DEPTH))
+        order = np.argsort(rng.random((count, cards.size)), axis=1)
+        shuffled = cards[order]
+        bits = np.left_shift(np.uint64(1), shuffled[:, :hidden].astype(np.uint64))
+        masks = np.bitwise_or.reduce(bits, axis=1) if hidden else np.zeros(count, dtype=np.uint64)
+        self.count = count
+        self.opponent = [opponent_known | int(mask) for mask in masks]
+        self.stock = shuffled[:, hidden:hidden + STOCK_DEPTH].tolist()
+        self.next_values = {}
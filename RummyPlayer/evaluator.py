@@ -0,0 +1,83 @@
+"""
+Parameterized evaluation of a finished lay-down, shared by every search in main4.py and
+the batched rollouts in rollouts.py.
+
+A finished hand is scored as a dot product of a few features of the cards kept with the
+weights in `learning_weights`:
+
+    gin_bonus          paid when no card is kept (going out)
+    meld_bonus         per card melded out of the hand, i.e. charged per card kept
+                       (the hand size is fixed within one decision, so the two are the
+                       same ordering)
+    discard_penalty    per deadwood point kept
+    high_card_penalty  per ten-or-higher card kept
+
+The defaults reproduce the original scoring: 100 for gin, otherwise minus the deadwood.
+tune.py fits the weights offline and writes them to a versioned JSON file that the
+server loads at startup (load_weights()).
+"""
+import json
+import os
+import time
+
+from cards import RANKS, SET_STRIDE, deadwood
+
+WEIGHT_NAMES = ("gin_bonus", "meld_bonus", "discard_penalty", "high_card_penalty")
+DEFAULT_WEIGHTS = {"gin_bonus": 100.0, "meld_bonus": 0.0, "discard_penalty": 1.0,
+                   "high_card_penalty": 0.0}
+HIGH_RANK = RANKS.index("T")
+HIGH_CARDS = sum(SET_STRIDE << rank for rank in range(HIGH_RANK, len(RANKS)))
+WEIGHTS_FORMAT = 1
+
+
+def weight_vector(weights):
+    """
+    The weights dict as a tuple in WEIGHT_NAMES order (missing names take the default).
+    """
+    return tuple(float(weights.get(name, DEFAULT_WEIGHTS[name])) for name in WEIGHT_NAMES)
+
+
+def score_hand(kept, weights):
+    """
+    Reward for finishing with the cards in mask `kept` still in hand.
+    weights: tuple from weight_vector().
+    """
+    if not kept:
+        return weights[0]
+    return -(weights[1] * kept.bit_count() + weights[2] * deadwood(kept)
+             + weights[3] * (kept & HIGH_CARDS).bit_count())
+
+
+def load_weights(path):
+    """
+    Returns (weights dict, version) from a weights file, or the defaults and version 0 if
+    the file does not exist.
+    """
+    if not os.path.exists(path):
+        return dict(DEFAULT_WEIGHTS), 0
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("format") != WEIGHTS_FORMAT:
+        raise ValueError(f"Unsupported weights format in {path}: {data.get('format')}")
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update({name: float(value) for name, value in data["weights"].items()
+                    if name in DEFAULT_WEIGHTS})
+    return weights, data["version"]
+
+
+def save_weights(path, weights, version, **info):
+    """
+    Writes weights as version `version`, atomically, with any extra info (games played,
+    win rate, ...) alongside. A copy is kept as <name>.v<version>.json.
+    """
+    data = {"format": WEIGHTS_FORMAT, "version": version,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "weights": {name: weights[name] for name in WEIGHT_NAMES}, **info}
+    text = json.dumps(data, indent=2) + "\n"
+    base, ext = os.path.splitext(path)
+    with open(f"{base}.v{version}{ext or '.json'}", "w") as f:
+        f.write(text)
+    temp = path + ".tmp"
+    with open(temp, "w") as f:
+        f.write(text)
+    os.replace(temp, path)
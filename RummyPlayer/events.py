@@ -0,0 +1,47 @@
+"""
+Tokenizer for the event text the game server sends with /draw/, /lay-down/ and
+/update-2p-game/. Each line is classified once, by a single precompiled pattern, into a
+typed event that process_events() in main4.py applies to the game's session.
+"""
+import re
+
+DRAW = "draw"            # a player draws from the stock
+TAKE = "take"            # a player takes the top of the discard pile
+DISCARD = "discard"      # a player discards a card
+HAND_END = "hand_end"    # the hand is over; the event carries the whole line
+
+_VERBS = {"draws": DRAW, "takes": TAKE, "discards": DISCARD}
+_ACTION = re.compile(r"^(.*?)\s*\b(draws|takes|discards)\b.*?(\S+)\s*$")
+
+
+def parse_event(line):
+    """
+    Returns (kind, player, card) for one event line, or None if it is not a card event.
+    For HAND_END, player is None and card is the whole line.
+    """
+    if " Ends:" in line:
+        return (HAND_END, None, line)
+    match = _ACTION.match(line)
+    if match is None:
+        return None
+    player, verb, card = match.groups()
+    return (_VERBS[verb], player, card)
+
+
+def parse_events(event_text):
+    """
+    Returns the typed events of a block of event text, in order.
+    """
+    events = []
+    for line in event_text.splitlines():
+        event = parse_event(line)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def is_player(player, name):
+    """
+    True if the player field of an event names `name` (it may carry a prefix).
+    """
+    return bool(name) and (player == name or player.endswith(" " + name))
@@ -0,0 +1,140 @@
+"""
+Persistent, bounded record of the hands the player has finished.
+
+Every hand is appended as one JSON line to numbered segment files on disk
+(hands-000001.jsonl, hands-000002.jsonl, ...). Memory holds only the last few hands in a
+ring buffer plus running totals, so recording a hand costs the same after a thousand
+hands as after one. Queries stream the segments from disk one line at a time.
+"""
+import json
+import os
+import time
+from collections import deque
+
+SEGMENT_PREFIX = "hands-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class HandHistory:
+    """
+    directory: where the segment files live (created on the first write).
+    recent: hands kept in memory for quick inspection.
+    segment_records: hands per segment file before a new one is started.
+    Totals (hands_played, hands_won, total_score) cover every hand on disk and are
+    rebuilt from the segments when the history is opened.
+    """
+    def __init__(self, directory, recent=256, segment_records=10000):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.recent = deque(maxlen=recent)
+        self.hands_played = 0
+        self.hands_won = 0
+        self.total_score = 0
+        self.segment = 0              # number of the segment being appended to
+        self.segment_count = 0        # hands already in that segment
+        self._file = None
+        for path in self.segments():
+            self.segment = int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            self.segment_count = 0
+            for record in _read_segment(path):
+                self._count(record)
+                self.segment_count += 1
+
+    @property
+    def win_rate(self):
+        return self.hands_won / self.hands_played if self.hands_played else 0.0
+
+    def totals(self):
+        return {"hands_played": self.hands_played, "hands_won": self.hands_won,
+                "total_score": self.total_score, "win_rate": round(self.win_rate, 4)}
+
+    def _count(self, record):
+        self.hands_played += 1
+        self.total_score += record["score"]
+        self.hands_won += record["won"]
+        self.recent.append(record)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """
+        Returns the segment file paths on disk, oldest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def record(self, result, score, game_id=None):
+        """
+        Appends one finished hand. A positive score counts as a win.
+        """
+        entry = {"time": round(time.time(), 3), "game": game_id, "result": result,
+                 "score": score, "won": score > 0}
+        if self._file is None or self.segment_count >= self.segment_records:
+            self._roll()
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.segment_count += 1
+        self._count(entry)
+        return entry
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        if self.segment == 0 or self.segment_count >= self.segment_records:
+            self.segment += 1
+            self.segment_count = 0
+        path = self._segment_path(self.segment)
+        torn = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self._file = open(path, "a")
+        if torn:
+            self._file.write("\n")     # start after a line a crash left unfinished
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # -------------------- QUERIES --------------------
+
+    def iter_hands(self, game_id=None):
+        """
+        Yields every recorded hand from disk, oldest first, optionally for one game only.
+        """
+        for path in self.segments():
+            for record in _read_segment(path):
+                if game_id is None or record.get("game") == game_id:
+                    yield record
+
+    def summarize(self, game_id=None):
+        """
+        Totals over the hands on disk (for one game, or all of them), streamed.
+        """
+        played = won = score = 0
+        for record in self.iter_hands(game_id):
+            played += 1
+            won += record["won"]
+            score += record["score"]
+        return {"hands_played": played, "hands_won": won, "total_score": score,
+                "win_rate": round(won / played, 4) if played else 0.0}
+
+
+def _read_segment(path):
+    """
+    Yields the records of one segment file; a torn last line (from a crash mid-write) is
+    skipped.
+    """
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,112 @@
+"""
+Non-blocking structured logging for the player.
+
+Handlers only put records on a bounded in-memory queue; a background QueueListener
+thread formats them as JSON lines and does the file (and console) I/O. Each category
+("draw", "lay_down", "events", ...) is its own logger under "rummy." with its own level,
+noisy categories can be sampled, and every message is capped in size before it is queued.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+
+ROOT = "rummy"
+
+
+def get_logger(category):
+    return logging.getLogger(ROOT + "." + category)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Passes one record in every `rate` (warnings and errors always pass).
+    """
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.seen = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        self.seen += 1
+        return (self.seen - 1) % self.rate == 0
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that truncates messages to max_chars and drops records (counting them)
+    instead of blocking when the queue is full.
+    """
+    def __init__(self, log_queue, max_chars):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + logging.Formatter().formatException(record.exc_info)
+        if len(message) > self.max_chars:
+            message = message[:self.max_chars] + f"... [{len(message) - self.max_chars} chars cut]"
+        # This handler is the only one on the root logger, so the record is reused in place.
+        record.msg, record.args, record.exc_info, record.exc_text = message, None, None, None
+        fields = getattr(record, "fields", None)
+        if fields:
+            # Snapshot structured fields now (the caller may mutate them) and cap each one.
+            record.fields = {key: value if isinstance(value, (int, float, bool, type(None)))
+                             else str(value)[:self.max_chars] for key, value in fields.items()}
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, category, message and any `fields` passed
+    through `extra={"fields": {...}}`.
+    """
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "category": record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(filename, level=logging.INFO, category_levels=None, sample_rates=None,
+                  max_chars=2000, queue_size=10000, console=False):
+    """
+    Routes every "rummy.*" logger (and the root logger) through one bounded queue to a
+    background writer. Returns the started QueueListener; call stop() on it to flush.
+    level: default level for categories not in category_levels.
+    category_levels: {category: level}.
+    sample_rates: {category: n} keeps one record in n for that category.
+    """
+    log_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    root.handlers[:] = [BoundedQueueHandler(log_queue, max_chars)]
+    root.setLevel(level)
+    for category, category_level in (category_levels or {}).items():
+        get_logger(category).setLevel(category_level)
+    for category, rate in (sample_rates or {}).items():
+        get_logger(category).addFilter(SampleFilter(rate))
+
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(JsonFormatter())
+    outputs = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+        outputs.append(console_handler)
+    listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    listener.start()
+    return listener
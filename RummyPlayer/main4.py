@@ -1,46 +1,226 @@
 import requests
 from fastapi import FastAPI, Response
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 import uvicorn
 import os
 import signal
 import logging
-import math, random, copy
+import math, random, time
+import asyncio, bisect, functools, gc, threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+from cards import (CARD_BITS, CARD_INDEX, CARD_NAMES, CARD_VALUES, FULL_DECK, NUM_CARDS, cards_to_mask,
+                   NUM_RANKS, SET_STRIDE, mask_to_cards, iter_cards, nth_card, deadwood, valid_meld_masks,
+                   canonical_suits, to_canonical_mask, from_canonical_mask, to_canonical_card,
+                   from_canonical_card, can_meld_with)
+from solver import draw_deadwoods, solve_lay_down
+from sessions import SessionStore
+from events import DRAW, TAKE, DISCARD, HAND_END, parse_events, is_player
+from logpipe import get_logger, setup_logging
+from decision_cache import DecisionCache
+from determinize import Determinizations
+from evaluator import DEFAULT_WEIGHTS, load_weights, score_hand, weight_vector
+from history import HandHistory
+from metrics import Counter, Gauge, Histogram, Registry, RequestMetrics
+import numpy as np
+from rollouts import rollout_mean
 
 # -------------------- GLOBAL CONFIGURATION --------------------
 
 DEBUG = True
 PORT = 11101
 USER_NAME = "nakai"
+LAY_DOWN_MODE = "mcts"   # "mcts" (sampled search), "ismcts" (search over sampled hidden cards)
+                         # or "exact" (optimal meld/deadwood solver)
+DRAW_MODE = "ev"         # "ev" (expected deadwood) or "meld" (can_form_meld yes/no check)
+# Wall-clock seconds MCTS may spend per decision; keep it under the game server's turn timeout.
+MCTS_TIME_BUDGET = float(os.environ.get("MCTS_TIME_BUDGET", "0.5"))
+MIN_TIME_BUDGET = 0.005  # smallest and largest per-request time_budget accepted;
+MAX_TIME_BUDGET = 5.0    # others get a 422
+MCTS_ITERATIONS = None   # optional hard cap on iterations per decision, None for budget only
+MCTS_WORKERS = int(os.environ.get("MCTS_WORKERS", "1"))   # >1 runs root-parallel MCTS in a process pool
+MCTS_ROLLOUTS_PER_LEAF = 1   # >1 scores each leaf with that many batched NumPy rollouts
+                             # (unpruned policy, so only used with MCTS_PRUNE_MOVES off)
+MCTS_TABLE_LIMIT = 50000     # search nodes a game keeps between turns
+ISMCTS_DETERMINIZATIONS = 256   # hidden-card samples drawn per "ismcts" decision, reused round-robin
+ISMCTS_OPPONENT_CARDS = 10   # cards the opponent is assumed to hold
+ISMCTS_LOOKAHEAD = 0.5       # weight of our next-turn hand against the hand we keep now
+ISMCTS_FEED_PENALTY = 0      # points charged when our discard melds with the opponent's hand
+MCTS_SUSPEND_GC = True       # pause the cyclic garbage collector while a search runs
+MCTS_PRUNE_MOVES = True      # drop dominated discards, expand the most promising moves first
+ROLLOUT_CUTOFF_DEPTH = 0     # random rollout moves before a static finish ends it (None: play out)
+PONDER = True                # search likely next hands while the opponent plays
+PONDER_BUDGET = 2.0          # seconds of background search per opponent turn
+PONDER_SLICE = 0.02          # seconds on one candidate hand before moving to the next
+PONDER_ENOUGH_VISITS = 2000  # pondered visits at which /lay-down/ only tops the search up
+PONDER_TOPUP_BUDGET = 0.01   # seconds /lay-down/ searches a sufficiently pondered hand
+SEARCH_THREADS = 1       # searches running at once off the event loop
+SEARCH_QUEUE_LIMIT = 4   # searches running or waiting before new ones get a 503
+LOOP_LAG_INTERVAL = 0.1  # seconds between event-loop lag samples
+LOOP_LAG_WARNING = 0.1   # log a warning when the loop is this many seconds late
+LOG_FILE = "RummyPlayer.log"
+LOG_CATEGORY_LEVELS = {}     # per-category overrides, e.g. {"events": logging.WARNING}
+LOG_SAMPLE_RATES = {"events": 20}   # keep one per-draw record in 20
+LOG_RECORD_LIMIT = 2000      # characters kept per log message or field
+DISCARD_INTEREST_WEIGHT = 1.0   # deadwood points we pay to avoid one unit of opponent interest
+DISCARD_MELD_DANGER = 5      # interest units for a discard that melds with the opponent's known cards
+LAY_DOWN_CACHE = True    # answer repeated lay-down positions from the decision cache
+LAY_DOWN_CACHE_SIZE = 10000  # decisions the cache keeps, least recently used dropped first
+WEIGHTS_FILE = "weights.json"   # evaluator weights written by tune.py, loaded at startup
+HISTORY_DIR = "history"      # append-only hand history segments
+HISTORY_RECENT = 256         # finished hands also kept in memory
+HISTORY_SEGMENT_RECORDS = 10000   # hands per history segment file
+MAX_SESSIONS = 64        # live games one process will track
+SESSION_IDLE_TIMEOUT = 600.0   # seconds before an untouched game is dropped
 
-# Global game state variables:
-hand = []              # list of cards in our hand
-discard = []           # list of cards organized as a stack
-cannot_discard = ""
-last_picked_card = ""
+# Log categories, each with its own level (see logpipe.py).
+log_game = get_logger("game")
+log_events = get_logger("events")
+log_draw = get_logger("draw")
+log_lay_down = get_logger("lay_down")
+log_search = get_logger("search")
+log_history = get_logger("history")
 
-#Globals to track opponent information.
-opponent_name = None
-opponent_discard_picks = []  # list of cards the opponent has picked from discard
+# Game state (hand, discard pile, opponent info) lives in one GameSession per game_id.
+sessions = SessionStore(max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT,
+                        on_evict=lambda session: cancel_ponder(session))
+
+# Lay-down decisions already made, shared by every game (see lay_down_key()).
+lay_down_cache = DecisionCache(max_entries=LAY_DOWN_CACHE_SIZE, enabled=LAY_DOWN_CACHE)
 
 """
-This dictionary tracks the history of hands played.
+Finished hands, appended to disk as they end (see history.py). Only the running totals
+and the last HISTORY_RECENT hands stay in memory.
 """
-game_history = {
-    "hands_played": 0,
-    "hands_won":0,
-    "total_score":0,
-    "hand_details": []
-}
-
-#These parameters are used in the evaluation function and adjusted over time
-learning_weights ={
-    "meld_bonus":10,        #Bonus for making a meld
-    "discard_penalty":1     #penalty multiplier for deadwood
-}
+game_history = HandHistory(HISTORY_DIR, recent=HISTORY_RECENT,
+                           segment_records=HISTORY_SEGMENT_RECORDS)
+
+#These parameters are used in the evaluation function (see evaluator.py). They are fitted
+#offline by tune.py, never inside a request, and read from WEIGHTS_FILE at startup.
+try:
+    learning_weights, weights_version = load_weights(WEIGHTS_FILE)
+except (OSError, ValueError, KeyError) as e:
+    get_logger("history").error("Could not load %s, using default weights: %s", WEIGHTS_FILE, e)
+    learning_weights, weights_version = dict(DEFAULT_WEIGHTS), 0
+eval_weights = weight_vector(learning_weights)   # the same weights as a tuple, for the search
+
+def set_learning_weights(weights):
+    """
+    Replaces the evaluator weights used by searches in this process.
+    """
+    global learning_weights, eval_weights
+    learning_weights = dict(DEFAULT_WEIGHTS, **weights)
+    eval_weights = weight_vector(learning_weights)
+
+# -------------------- SEARCH EXECUTOR --------------------
+# CPU-bound decisions run on a small thread pool so the event loop keeps serving
+# /update-2p-game/, health checks and /shutdown while a search is in progress.
+
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="search")
+searches_pending = 0     # only touched from the event loop thread
+ponder_cancels = set()   # cancel events of running ponder jobs, set when real work arrives
+loop_lag = {"last": 0.0, "max": 0.0}
+
+class SearchOverloaded(Exception):
+    pass
+
+async def run_search(fn, *args, **kwargs):
+    """
+    Runs fn(*args, **kwargs) on the search executor and awaits the result.
+    Raises SearchOverloaded instead of queueing more than SEARCH_QUEUE_LIMIT searches.
+    """
+    global searches_pending
+    if searches_pending >= SEARCH_QUEUE_LIMIT:
+        raise SearchOverloaded(f"{searches_pending} searches already pending")
+    for cancel in ponder_cancels:
+        cancel.set()     # background pondering must never delay a real decision
+    searches_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(search_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        searches_pending -= 1
+
+async def monitor_loop_lag():
+    """
+    Samples how late the event loop wakes up from a fixed sleep.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, loop.time() - expected)
+        loop_lag["last"] = lag
+        loop_lag["max"] = max(loop_lag["max"], lag)
+        loop_lag_seconds.observe(lag)
+        if lag > LOOP_LAG_WARNING:
+            log_search.warning("Event loop lagged %.0f ms", lag * 1000)
+
+# -------------------- METRICS --------------------
+# Served as Prometheus text by /metrics. Handlers only bump in-memory counters; gauges
+# backed by existing state are read when /metrics is scraped.
+
+metrics = Registry()
+http_requests = metrics.add(Counter(
+    "rummy_http_requests_total", "Requests by endpoint and status.", labels=("path", "status")))
+http_latency = metrics.add(Histogram(
+    "rummy_http_request_seconds", "Request latency by endpoint.", labels=("path",)))
+search_iterations = metrics.add(Histogram(
+    "rummy_mcts_iterations", "MCTS iterations per lay-down decision.",
+    buckets=(100, 300, 1000, 3000, 10000, 30000, 100000)))
+search_new_nodes = metrics.add(Histogram(
+    "rummy_mcts_new_nodes", "Search tree nodes added per lay-down decision.",
+    buckets=(10, 30, 100, 300, 1000, 3000, 10000)))
+search_seconds = metrics.add(Counter(
+    "rummy_mcts_search_seconds_total", "Seconds spent in lay-down searches."))
+search_rollouts = metrics.add(Counter(
+    "rummy_mcts_rollouts_total", "Rollouts run by lay-down searches."))
+rollout_rate = metrics.add(Gauge(
+    "rummy_mcts_rollouts_per_second", "Rollout rate of the last lay-down search."))
+metrics.add(Gauge(
+    "rummy_mcts_table_nodes", "Search nodes held in the tables of all live games.",
+    fn=lambda: sum(len(s.search_table) for s in list(sessions.sessions.values()))))
+metrics.add(Gauge("rummy_live_games", "Games tracked by the session store.",
+                  fn=lambda: len(sessions.sessions)))
+metrics.add(Gauge("rummy_searches_pending", "Searches running or queued.",
+                  fn=lambda: searches_pending))
+metrics.add(Counter("rummy_lay_down_cache_hits_total", "Lay-downs answered from the cache.",
+                    fn=lambda: lay_down_cache.hits))
+metrics.add(Counter("rummy_lay_down_cache_misses_total", "Lay-downs that had to search.",
+                    fn=lambda: lay_down_cache.misses))
+metrics.add(Gauge("rummy_lay_down_cache_entries", "Decisions held in the lay-down cache.",
+                  fn=lambda: len(lay_down_cache)))
+loop_lag_seconds = metrics.add(Histogram(
+    "rummy_event_loop_lag_seconds", "How late the event loop woke from each lag sample.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+metrics.add(Gauge("rummy_event_loop_lag_max_seconds", "Largest event-loop lag seen.",
+                  fn=lambda: loop_lag["max"]))
+
+def record_search(stats):
+    """
+    Adds one lay-down search's stats (as filled in by mcts()) to the metrics.
+    """
+    if not stats.get("iterations"):
+        return     # the exact solver fills no search stats
+    search_iterations.observe(stats["iterations"])
+    search_new_nodes.observe(stats.get("expansions", 0))
+    search_seconds.inc(amount=stats["elapsed"])
+    search_rollouts.inc(amount=stats["rollouts"])
+    if stats["elapsed"] > 0:
+        rollout_rate.set(stats["rollouts"] / stats["elapsed"])
+
 # -------------------- FASTAPI SETUP --------------------
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    monitor = asyncio.create_task(monitor_loop_lag())
+    yield
+    monitor.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 async def root():
@@ -55,67 +235,94 @@ class GameInfo(BaseModel):
 # Model for starting a new hand.
 class HandInfo(BaseModel):
     hand: str
+    # Falls back to the most recently started game, but only while that is the only live
+    # game: with several, guessing would reset the wrong game's hand, tracker and table.
+    game_id: Optional[str] = None
 
 # New model for update endpoints (/draw/, /update-2p-game/, /lay-down/).
 class UpdateInfo(BaseModel):
     game_id: str
     event: str
+    # Optional per-request override of MCTS_TIME_BUDGET. Bounded (and finite) because the
+    # search stops on its deadline alone: an unbounded budget would hold the search thread,
+    # and a near-zero one stops it after a handful of iterations.
+    time_budget: Optional[float] = Field(None, ge=MIN_TIME_BUDGET, le=MAX_TIME_BUDGET,
+                                         allow_inf_nan=False)
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request, exc):
+    """
+    422 for a malformed request. The offending input is left out of the details: FastAPI's
+    default handler echoes it back and fails on values JSON cannot carry (NaN, Infinity).
+    """
+    errors = [{k: v for k, v in error.items() if k not in ("input", "ctx")} for error in exc.errors()]
+    return JSONResponse({"detail": errors}, status_code=422)
+
+def unknown_game(game_id, endpoint):
+    log_game.warning("%s for unknown game %s", endpoint, game_id)
+    return Response(f"Unknown game: {game_id}", status_code=404)
 
 @app.post("/start-2p-game/")
 async def start_game(game_info: GameInfo):
-    global hand, opponent_name, discard
-    hand = game_info.hand.split(" ")
-    hand.sort()
-    opponent_name = game_info.opponent   # Store the opponent's name.
-    discard = []
-    logging.info("2p game started, hand is " + str(hand) + ", opponent: " + opponent_name)
+    old_session = sessions.sessions.get(game_info.game_id)
+    if old_session is not None:
+        await stop_pondering(old_session)
+    session = sessions.start(game_info.game_id, opponent_name=game_info.opponent)
+    session.start_hand(game_info.hand.split(" "))
+    log_game.info("2p game started", extra={"fields": {
+        "game": session.game_id, "hand": session.hand, "opponent": session.opponent_name}})
     return {"status": "OK"}
 
 
 
 @app.post("/start-2p-hand/")
 async def start_hand(hand_info: HandInfo):
-    global hand, discard
-    discard = []
-    hand = hand_info.hand.split(" ")
-    hand.sort()
-    logging.info("2p hand started, hand is " + str(hand))
+    if hand_info.game_id is None and len(sessions) > 1:
+        log_game.warning("Refused a hand start without game_id while %d games are live", len(sessions))
+        return Response("game_id is required while several games are live", status_code=400)
+    session = sessions.get(hand_info.game_id)
+    if session is None:
+        return unknown_game(hand_info.game_id, "/start-2p-hand/")
+    await stop_pondering(session)
+    session.start_hand(hand_info.hand.split(" "))
+    log_game.info("2p hand started", extra={"fields": {"game": session.game_id, "hand": session.hand}})
     return {"status": "OK"}
 
 # -------------------- EVENT PROCESSING --------------------
 
-def process_events(event_text):
-    """
-    Process event text from the game server. Also records which cards the opponent takes from the discard.
-    """
-    global hand, discard, opponent_discard_picks, opponent_name
-    for event_line in event_text.splitlines():
-        # When we draw or take a card, add it to our hand.
-        if ((USER_NAME + " draws") in event_line or (USER_NAME + " takes") in event_line):
-            print("In draw, hand is " + str(hand))
-            print("Drew " + event_line.split(" ")[-1])
-            drawn_card = event_line.split(" ")[-1]
-            logging.info("Drew " + drawn_card + ", hand before: " + str(hand))
-            hand.append(drawn_card)
-            hand.sort()
-            print("Hand is now " + str(hand))
-            logging.info("Hand is now: " + str(hand))
-        # When any player discards, add the card to the discard pile.
-        if "discards" in event_line:
-            card = event_line.split(" ")[-1]
-            discard.insert(0, card)
-        # When a card is taken from discard:
-        if "takes" in event_line:
-            # Record if the opponent took a card.
-            if opponent_name and opponent_name in event_line:
-                taken_card = event_line.split(" ")[-1]
-                opponent_discard_picks.append(taken_card)
-                logging.info("Opponent took " + taken_card + " from discard.")
-            if discard:
-                discard.pop(0)
-        if " Ends:" in event_line:
-            logging.info(event_line)
-            print(event_line)
+def process_events(session, event_text):
+    """
+    Process event text from the game server into the game's session: our hand, the
+    discard pile and the card tracker (see tracker.py).
+    """
+    hand, discard, cards = session.hand, session.discard, session.cards
+    for kind, player, card in parse_events(event_text):
+        if kind == HAND_END:
+            log_game.info(card)
+            continue
+        index = CARD_INDEX.get(card)
+        ours = is_player(player, USER_NAME)
+        if kind == DISCARD:
+            # When any player discards, add the card to the discard pile.
+            discard.appendleft(card)
+            if index is not None:
+                cards.discarded(index, by_opponent=not ours)
+        elif kind == DRAW or kind == TAKE:
+            # When we draw or take a card, add it to our hand.
+            if ours:
+                bisect.insort(hand, card)
+                log_events.info("Drew %s", card)
+            if kind == TAKE:
+                if index is not None:
+                    if ours:
+                        cards.we_take(index)
+                    else:
+                        cards.opponent_takes(index)
+                        log_events.info("Opponent took %s from discard.", card)
+                if discard:
+                    discard.popleft()
+            elif ours and index is not None:
+                cards.we_draw(index)
 
 # -------------------- HELPER FUNCTIONS --------------------
 
@@ -134,45 +341,58 @@ def get_valid_melds(cards):
     Returns a list of candidate melds from the given list of cards.
     A meld is either a set (3+ of the same rank) or a run (3+ consecutive cards in the same suit).
     """
-    melds = []
-    # Check for sets.
-    rank_dict = {}
-    for card in cards:
-        rank_dict.setdefault(card[0], []).append(card)
-    for rank, same_rank in rank_dict.items():
-        if len(same_rank) >= 3:
-            melds.append(sorted(same_rank))
-    # Check for runs.
-    suit_dict = {}
-    for card in cards:
-        suit_dict.setdefault(card[1], []).append(card)
-    for suit, suit_cards in suit_dict.items():
-        sorted_cards = sorted(suit_cards, key=lambda c: card_value(c))
-        seq = [sorted_cards[0]]
-        for i in range(1, len(sorted_cards)):
-            if card_value(sorted_cards[i]) == card_value(seq[-1]) + 1:
-                seq.append(sorted_cards[i])
-            else:
-                if len(seq) >= 3:
-                    melds.append(seq.copy())
-                seq = [sorted_cards[i]]
-        if len(seq) >= 3:
-            melds.append(seq.copy())
-    return melds
+    return [mask_to_cards(meld) for meld in valid_meld_masks(cards_to_mask(cards))]
 
 # -------------------- MCTS LOGIC --------------------
+# Search states hold bitmasks from cards.py: "remaining" is the hand still to be played,
+# "melds" a tuple of meld masks and "discard" a card index (or None).
 
-def copy_state(state):
+def make_root_state(cards):
     """
-    Creates a deep copy of the game state.
+    Builds the root search state for a list of card strings.
     """
     return {
-        "remaining": state["remaining"].copy(),
-        "melds": copy.deepcopy(state["melds"]),
-        "discard": state["discard"],
-        "finished": state["finished"]
+        "remaining": cards_to_mask(cards),
+        "melds": (),
+        "discard": None,
+        "finished": False
     }
 
+def copy_state(state):
+    """
+    Creates a copy of the game state. Every field is immutable, so a shallow copy suffices.
+    """
+    return state.copy()
+
+def _map_state_suits(state, map_mask, map_card, perm):
+    mapped = state.copy()
+    mapped["remaining"] = map_mask(state["remaining"], perm)
+    mapped["melds"] = tuple(map_mask(meld, perm) for meld in state["melds"])
+    if state["discard"] is not None:
+        mapped["discard"] = map_card(state["discard"], perm)
+    return mapped
+
+def canonical_state(state, perm):
+    """
+    Maps a state into the canonical suits of perm (see cards.canonical_suits()).
+    """
+    return _map_state_suits(state, to_canonical_mask, to_canonical_card, perm)
+
+def real_state(state, perm):
+    """
+    Maps a state in the canonical suits of perm back to real suits.
+    """
+    return _map_state_suits(state, from_canonical_mask, from_canonical_card, perm)
+
+def canonical_root_state(cards):
+    """
+    Returns (root state in canonical suits, perm). Searches run on canonical states so
+    that every suit permutation of a hand shares one set of transposition-table entries.
+    """
+    state = make_root_state(cards)
+    perm = canonical_suits(state["remaining"])
+    return canonical_state(state, perm), perm
+
 
 def get_possible_moves(state):
     """
@@ -180,32 +400,76 @@ def get_possible_moves(state):
     """
     if state["finished"]:
         return []
-    moves = []
-    valid_melds = get_valid_melds(state["remaining"])
-    for meld in valid_melds:
-        if all(card in state["remaining"] for card in meld):
-            moves.append(("meld", meld))
-    if state["remaining"]:
-        for card in state["remaining"]:
-            moves.append(("finish", card))
+    return moves_from(state["remaining"])
+
+def moves_from(remaining):
+    """
+    Moves available to an unfinished hand: every valid meld and every discard.
+    With MCTS_PRUNE_MOVES, discards of cards that belong to a meld are dropped whenever
+    that meld can be laid first with a card left over: laying it and discarding another
+    card keeps a subset of the cards, which never scores worse. The rest are ordered
+    from least to most promising (low discards, then melds by the deadwood they remove),
+    since the search expands from the end of the list.
+    """
+    melds = valid_meld_masks(remaining)
+    if not MCTS_PRUNE_MOVES:
+        moves = [("meld", meld) for meld in melds]
+        moves.extend(("finish", card) for card in iter_cards(remaining))
+        return moves
+    spare = spare_cards(remaining, melds)
+    moves = [("finish", card) for card in sorted(iter_cards(spare), key=CARD_VALUES.__getitem__)]
+    moves.extend(("meld", meld) for meld in sorted(melds, key=deadwood))
     return moves
 
+def spare_cards(remaining, melds):
+    """
+    The cards worth discarding: those not in any meld that leaves a card over once laid.
+    """
+    spare = remaining
+    for meld in melds:
+        if meld != remaining:
+            spare &= ~meld
+    return spare
+
+def static_finish(remaining, melds):
+    """
+    Fast estimate of how a hand finishes: lays disjoint melds greedily, most deadwood
+    first (always leaving a card to discard), then discards the highest card left.
+    Exact when there are no melds. Returns (kept, discard).
+    """
+    kept = remaining
+    if len(melds) > 1:
+        melds = sorted(melds, key=deadwood, reverse=True)
+    for meld in melds:
+        if meld & kept == meld and meld != kept:
+            kept &= ~meld
+    for rank in range(NUM_RANKS - 1, -1, -1):
+        same_rank = kept & SET_STRIDE << rank
+        if same_rank:
+            low = same_rank & -same_rank
+            return kept ^ low, low.bit_length() - 1
+
+def move_result(remaining, move):
+    """
+    Returns the (remaining, discard) a move leads to, without building a state dict.
+    """
+    if move[0] == "meld":
+        return remaining & ~move[1], None
+    return remaining & ~CARD_BITS[move[1]], move[1]
+
 def apply_move(state, move):
     """
     Applies a move to the given state and returns the new state.
     """
-    new_state = copy_state(state)
+    new_state = state.copy()
     if move[0] == "meld":
         meld = move[1]
-        for card in meld:
-            if card in new_state["remaining"]:
-                new_state["remaining"].remove(card)
-        new_state["melds"].append(meld)
+        new_state["remaining"] = state["remaining"] & ~meld
+        new_state["melds"] = state["melds"] + (meld,)
         new_state["finished"] = False
     elif move[0] == "finish":
         card = move[1]
-        if card in new_state["remaining"]:
-            new_state["remaining"].remove(card)
+        new_state["remaining"] = state["remaining"] & ~CARD_BITS[card]
         new_state["discard"] = card
         new_state["finished"] = True
     return new_state
@@ -216,51 +480,117 @@ def evaluate_state(state):
     """
     if not state["finished"]:
         raise ValueError("Tried to evaluate a nonterminal state")
-    deadwood = sum(card_value(c) for c in state["remaining"])
-    if deadwood == 0:
+    return score_hand(state["remaining"], eval_weights)
+
+def score_deadwood(points):
+    if points == 0:
         return 100  # Bonus for going gin!
-    return -deadwood
+    return -points
 
 def simulate(state):
     """
     Simulates a random game from the given state and returns the final score.
+    Works directly on the remaining-cards mask instead of building intermediate states.
     """
-    current_state = copy_state(state)
-    while not current_state["finished"]:
-        moves = get_possible_moves(current_state)
-        if not moves:
-            if current_state["remaining"]:
-                move = ("finish", random.choice(current_state["remaining"]))
-            else:
-                break
+    if state["finished"]:
+        return evaluate_state(state)
+    return playout(state["remaining"])
+
+def playout(remaining, hidden=None, which=0):
+    """
+    One random playout from an unfinished hand: meld or discard uniformly at random.
+    With MCTS_PRUNE_MOVES, dominated discards are skipped and the playout ends with
+    static_finish() once no meld is left or after ROLLOUT_CUTOFF_DEPTH random moves.
+    With hidden (Determinizations), the finish is scored in determinization `which`.
+    """
+    depth = 0
+    while remaining:
+        melds = valid_meld_masks(remaining)
+        if MCTS_PRUNE_MOVES:
+            if not melds or (ROLLOUT_CUTOFF_DEPTH is not None and depth >= ROLLOUT_CUTOFF_DEPTH):
+                kept, card = static_finish(remaining, melds)
+                if hidden is not None:
+                    return determinized_value(kept, card, hidden, which)
+                return score_hand(kept, eval_weights)
+            depth += 1
+            spare = spare_cards(remaining, melds)
         else:
-            move = random.choice(moves)
-        current_state = apply_move(current_state, move)
-    try:
-        return evaluate_state(current_state)
-    except ValueError:
-        return -1000
+            spare = remaining
+        pick = random.randrange(len(melds) + spare.bit_count())
+        if pick < len(melds):
+            remaining &= ~melds[pick]
+        else:
+            card = nth_card(spare, pick - len(melds))
+            if hidden is not None:
+                return determinized_value(remaining & ~CARD_BITS[card], card, hidden, which)
+            return score_hand(remaining & ~CARD_BITS[card], eval_weights)
+    return -1000
+
+def determinized_value(kept, discard, hidden, which):
+    """
+    Reward for finishing with `kept` after discarding `discard`, in determinization
+    `which` of hidden: the hand kept now blended (ISMCTS_LOOKAHEAD) with the best
+    lay-down after our next stock draw, less ISMCTS_FEED_PENALTY if the opponent's
+    sampled hand melds with the discard (they take it, and we draw the top stock card
+    instead of the one after it).
+    """
+    now = score_hand(kept, eval_weights)
+    if not kept:
+        return now
+    fed = can_meld_with(hidden.opponent[which], discard)
+    stock = hidden.stock[which]
+    draw_at = 0 if fed else 1
+    penalty = ISMCTS_FEED_PENALTY if fed else 0
+    if len(stock) <= draw_at:
+        return now - penalty
+    hand = kept | CARD_BITS[stock[draw_at]]
+    later = hidden.next_values.get(hand)
+    if later is None:
+        later = hidden.next_values[hand] = score_hand(solve_lay_down(hand)["remaining"], eval_weights)
+    return (1 - ISMCTS_LOOKAHEAD) * now + ISMCTS_LOOKAHEAD * later - penalty
 
 class MCTSNode:
     """
-    A node in the MCTS tree.
-    state: The game state at this node.
-    parent: The parent node(the state from which this state was reached).
-    move: The move that led from the parent node to this node.
-    children: The child nodes (states reachable from this state or that have been expanded from this node).
-    untried_moves: The moves that have not been explored from this state.
-    visits: The number of times this node has been visited.
-    total_reward: The total reward received from this node.
-    """
-    def __init__(self, state, parent=None, move=None):
-        self.state = state
-        self.parent = parent
-        self.move = move  # The move that led to this state.
+    A node in the MCTS graph. Nodes are shared through a transposition table, so a node
+    can be reached along several paths (melding A then B, or B then A).
+    Nodes are slotted and hold only what the search needs: the position as two ints and
+    the statistics. Edges are bare child nodes; the move along an edge is recovered from
+    the two positions (see edge_move()), and the melds on a path are rebuilt from those
+    moves when a play is chosen (simulate_sequence()).
+    remaining: mask of cards left to play.
+    discard: card discarded to reach this node, None until the hand is finished.
+    children: child nodes expanded from this node.
+    untried_moves: moves not explored yet; None until the node is first expanded.
+    visits: The number of times this node has been visited, along any path.
+    total_reward: The total reward received from this node, along any path.
+    """
+    __slots__ = ("remaining", "discard", "children", "untried_moves", "visits", "total_reward")
+
+    def __init__(self, remaining, discard=None):
+        self.remaining = remaining
+        self.discard = discard
         self.children = []
-        self.untried_moves = get_possible_moves(state)
+        self.untried_moves = None
         self.visits = 0
         self.total_reward = 0.0
 
+def node_key(remaining, discard):
+    """
+    Transposition-table key: the cards left, with the discard (if any) packed above them.
+    """
+    return remaining if discard is None else remaining | (discard + 1) << NUM_CARDS
+
+def state_key(state):
+    return node_key(state["remaining"], state["discard"])
+
+def edge_move(parent, child):
+    """
+    The move that leads from parent to child.
+    """
+    if child.discard is not None:
+        return ("finish", child.discard)
+    return ("meld", parent.remaining ^ child.remaining)
+
 def is_terminal(state):
     return state["finished"]
 
@@ -271,115 +601,534 @@ def select_child(node):
         key=lambda c: c.total_reward / c.visits + C * math.sqrt(2 * math.log(node.visits) / c.visits)
     )
 
-def mcts(root_state, iterations=1000):
-    root = MCTSNode(root_state)
-    for i in range(iterations):
+@contextmanager
+def gc_suspended(active=True):
+    """
+    Pauses the cyclic garbage collector for the duration of the block. Search trees hold
+    no reference cycles (refcounting frees them), so collections triggered by the many
+    node allocations only rescan the tree.
+    """
+    if not active or not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+CLOCK_CHECK_INTERVAL = 16   # iterations between deadline checks (must be a power of two)
+
+def mcts(root_state, iterations=None, time_budget=None, rollouts=1, table=None, cancel=None,
+         stats=None, suspend_gc=False, hidden=None):
+    """
+    Runs UCT over a graph of positions deduplicated by state_key().
+    Anytime: stops after `iterations`, or once `time_budget` seconds have passed, whichever
+    comes first (1000 iterations if neither is given). The tree is always usable by
+    get_best_sequence() when it returns.
+    rollouts: playouts per leaf; above 1 they run as one batch in rollouts.py and the
+    leaf is scored with their mean. The batch plays the unpruned uniform policy, so
+    with MCTS_PRUNE_MOVES on rollouts is ignored and every leaf gets one playout().
+    table: optional transposition table kept by the caller between searches. A node's
+    value depends only on its own cards, so nodes from earlier turns stay valid; the
+    search re-roots on the node for root_state when the table already has it.
+    cancel: optional threading.Event that stops the search early when set.
+    stats: optional dict that receives "iterations", "elapsed" (seconds), "rollouts",
+    "expansions" (nodes created), "transpositions" (expansions answered by an
+    existing node instead), "reused_visits" (root visits inherited from the table) and
+    "root_visits" (effective iterations behind the decision).
+    suspend_gc: pause the cyclic garbage collector while searching (see gc_suspended()).
+    hidden: optional Determinizations. Information-set mode: iteration i scores its leaf
+    in determinization i % hidden.count with determinized_value(), so every node's
+    statistics are shared across all the sampled deals (rollouts is then ignored).
+    """
+    if MCTS_PRUNE_MOVES:
+        rollouts = 1
+    with gc_suspended(suspend_gc):
+        return _mcts(root_state, iterations, time_budget, rollouts, table, cancel, stats, hidden)
+
+def _mcts(root_state, iterations, time_budget, rollouts, table, cancel, stats, hidden):
+    started = time.perf_counter()
+    if iterations is None and time_budget is None:
+        iterations = 1000
+    deadline = None if time_budget is None else started + time_budget
+    if table is None:
+        table = {}
+    root_key = state_key(root_state)
+    root = table.get(root_key)
+    if root is None:
+        root = table[root_key] = MCTSNode(root_state["remaining"], root_state["discard"])
+    reused_visits = root.visits
+    expansions = transpositions = playouts = 0
+    rng = np.random.default_rng(random.getrandbits(64)) if rollouts > 1 else None
+    i = 0
+    while iterations is None or i < iterations:
+        if i and not i & (CLOCK_CHECK_INTERVAL - 1):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if cancel is not None and cancel.is_set():
+                break
+        i += 1
         node = root
+        path = [root]
         # Selection:
-        while node.untried_moves == [] and not is_terminal(node.state):
+        while not node.untried_moves and node.children:
             node = select_child(node)
-        # Expansion:
+            path.append(node)
+        # Expansion (a node's moves are generated the first time it is expanded):
+        if node.untried_moves is None and node.discard is None:
+            node.untried_moves = moves_from(node.remaining)
         if node.untried_moves:
-            move = random.choice(node.untried_moves)
-            new_state = apply_move(node.state, move)
-            child = MCTSNode(new_state, parent=node, move=move)
+            if MCTS_PRUNE_MOVES:
+                move = node.untried_moves.pop()   # most promising first, see moves_from()
+            else:
+                move = node.untried_moves.pop(random.randrange(len(node.untried_moves)))
+            remaining, discard = move_result(node.remaining, move)
+            key = node_key(remaining, discard)
+            child = table.get(key)
+            if child is None:
+                child = table[key] = MCTSNode(remaining, discard)
+                expansions += 1
+            else:
+                transpositions += 1
             node.children.append(child)
-            node.untried_moves.remove(move)
             node = child
+            path.append(node)
         # Simulation:
-        reward = simulate(node.state)
-        # Backpropagation:
-        while node is not None:
+        if hidden is not None:
+            which = i % hidden.count
+            if node.discard is not None:
+                reward = determinized_value(node.remaining, node.discard, hidden, which)
+            else:
+                reward = playout(node.remaining, hidden, which)
+            playouts += 1
+        elif node.discard is not None:
+            reward = score_hand(node.remaining, eval_weights)
+            playouts += 1
+        elif rng is None:
+            reward = playout(node.remaining)
+            playouts += 1
+        else:
+            reward = rollout_mean(node.remaining, rollouts, rng, eval_weights)
+            playouts += rollouts
+        # Backpropagation along the path actually taken:
+        for node in path:
             node.visits += 1
             node.total_reward += reward
-            node = node.parent
+    if stats is not None:
+        stats["iterations"] = stats.get("iterations", 0) + i
+        stats["elapsed"] = stats.get("elapsed", 0.0) + time.perf_counter() - started
+        stats["rollouts"] = stats.get("rollouts", 0) + playouts
+        stats["reused_visits"] = reused_visits
+        stats["root_visits"] = root.visits
+        stats["expansions"] = stats.get("expansions", 0) + expansions
+        stats["transpositions"] = stats.get("transpositions", 0) + transpositions
     return root
 
+def trim_table(table, root, max_nodes):
+    """
+    Keeps a transposition table that lives across turns under max_nodes: once it is
+    over the limit, only the nodes reachable from root survive (or none, if even those
+    are too many).
+    """
+    if len(table) <= max_nodes:
+        return
+    keep = {}
+    stack = [root]
+    while stack and len(keep) <= max_nodes:
+        node = stack.pop()
+        key = node_key(node.remaining, node.discard)
+        if key not in keep:
+            keep[key] = node
+            stack.extend(node.children)
+    table.clear()
+    if len(keep) <= max_nodes:
+        table.update(keep)
+
 def get_best_sequence(root):
     """
-    Returns the sequence of moves that leads to the best child node.
+    Returns the sequence of moves that leads to the best child node. It ends without a
+    discard if the search stopped before expanding the last node (see finish_play()).
     """
     sequence = []
     node = root
     while node.children:
-        node = max(node.children, key=lambda c: c.visits)
-        if node.move is not None:
-            sequence.append(node.move)
+        child = max(node.children, key=lambda c: c.visits)
+        sequence.append(edge_move(node, child))
+        node = child
     return sequence
 
+# -------------------- ROOT-PARALLEL MCTS --------------------
+# Each worker process runs an independent search with its own seed and sends back a
+# summary of its tree; the summaries are merged move by move so get_best_sequence()
+# picks the play from the combined visit counts.
+
+search_pool = None
+
+def start_search_pool(workers=None):
+    """
+    Starts the shared process pool once and forks all of its workers up front.
+    """
+    global search_pool
+    if search_pool is None:
+        workers = workers or MCTS_WORKERS
+        search_pool = ProcessPoolExecutor(max_workers=workers)
+        for future in [search_pool.submit(int) for _ in range(workers)]:
+            future.result()
+    return search_pool
+
+def summarize_tree(node, min_visits):
+    """
+    Returns [(move, visits, total_reward, child_summary), ...] for the edges below node
+    that were visited at least min_visits times.
+    """
+    return [(edge_move(node, child), child.visits, child.total_reward, summarize_tree(child, min_visits))
+            for child in node.children if child.visits >= min_visits]
+
+def mcts_worker(root_state, iterations, time_budget, rollouts, seed):
+    """
+    Runs one independent search in a pool worker and returns (tree summary, stats).
+    """
+    random.seed(seed)
+    stats = {}
+    root = mcts(root_state, iterations=iterations, time_budget=time_budget, rollouts=rollouts,
+                stats=stats, suspend_gc=MCTS_SUSPEND_GC)
+    return summarize_tree(root, max(1, root.visits // 1000)), stats
+
+def merge_summary(node, summary):
+    """
+    Adds a worker's tree summary into node, creating children for moves it has not seen.
+    """
+    edges = {edge_move(node, child): child for child in node.children}
+    for move, visits, total_reward, child_summary in summary:
+        child = edges.get(move)
+        if child is None:
+            child = edges[move] = MCTSNode(*move_result(node.remaining, move))
+            node.children.append(child)
+        child.visits += visits
+        child.total_reward += total_reward
+        merge_summary(child, child_summary)
+
+def parallel_mcts(root_state, pool, workers, iterations=None, time_budget=None, rollouts=1,
+                  stats=None):
+    """
+    Root-parallel MCTS: `workers` independent searches on `pool`, merged into one tree.
+    """
+    started = time.perf_counter()
+    seeds = [random.getrandbits(32) for _ in range(workers)]
+    futures = [pool.submit(mcts_worker, root_state, iterations, time_budget, rollouts, seed)
+               for seed in seeds]
+    root = MCTSNode(root_state["remaining"], root_state["discard"])
+    for future in futures:
+        summary, worker_stats = future.result()
+        merge_summary(root, summary)
+        root.visits += worker_stats["iterations"]
+        if stats is not None:
+            for name in ("iterations", "rollouts", "expansions", "transpositions"):
+                stats[name] = stats.get(name, 0) + worker_stats[name]
+    if stats is not None:
+        stats["workers"] = workers
+        stats["elapsed"] = time.perf_counter() - started
+    return root
+
 def simulate_sequence(state, sequence):
     s = copy_state(state)
     for move in sequence:
         s = apply_move(s, move)
     return s
 
+def finish_play(root_state, state):
+    """
+    Completes a play the search left unfinished (a short budget can stop it on a node it
+    has reached but not expanded): the exact solver lays down the cards still held after
+    the melds chosen so far, or the whole hand if those melds used every card.
+    """
+    if state["finished"]:
+        return state
+    if not state["remaining"]:
+        return solve_lay_down(root_state["remaining"])
+    finished = solve_lay_down(state["remaining"])
+    finished["melds"] = state["melds"] + finished["melds"]
+    return finished
+
 def build_play_string(final_state):
     play_string = ""
     for meld in final_state["melds"]:
-        play_string += "meld " + " ".join(meld) + " "
-    if final_state["finished"] and final_state["discard"]:
-        play_string += "discard " + final_state["discard"]
+        play_string += "meld " + " ".join(mask_to_cards(meld)) + " "
+    if final_state["finished"] and final_state["discard"] is not None:
+        play_string += "discard " + CARD_NAMES[final_state["discard"]]
     return play_string.strip()
 
-def update_game_history(hand_result, score):
+def choose_lay_down(cards, mode=None, forbidden_discard=None, time_budget=None, table=None,
+                    stats=None, unseen=None, opponent=0):
     """
-    A-2: Update the global game_history with the result of a hand.
-    hand_result: A string or dict describing the outcome of the hand.
-    score: Numeric score (positive for win, negative for loss).
+    Picks the melds and discard for a list of card strings and returns the final state.
+    mode: "mcts", "ismcts" or "exact"; defaults to LAY_DOWN_MODE.
+    forbidden_discard: card string that may not be discarded (only honoured by "exact").
+    time_budget: seconds MCTS may search; defaults to MCTS_TIME_BUDGET.
+    table: transposition table to reuse across turns (single-process "mcts" only). An
+    "ismcts" node's value depends on the decision's determinizations and suit frame, not
+    just its cards, so every "ismcts" decision searches a fresh table and this is ignored.
+    stats: optional dict filled with search counters (see mcts()).
+    unseen, opponent: masks of the cards we have not seen and the cards the opponent is
+    known to hold (a CardTracker's unseen and opponent), used by "ismcts". unseen
+    defaults to every card not in our hand. "ismcts" always searches in this process.
     """
-    global game_history
-    game_history["hands_played"] += 1
-    game_history["total_score"] += score
-    if score > 0:  # Assume positive score means a win.
-        game_history["hands_won"] += 1
-    game_history["hand_details"].append({
-        "result": hand_result,
-        "score": score
-    })
-    logging.info("Updated game history: " + str(game_history))
+    mode = mode or LAY_DOWN_MODE
+    root_state, perm = canonical_root_state(cards)
+    if mode == "exact":
+        forbidden = CARD_INDEX.get(forbidden_discard)
+        if forbidden is not None:
+            forbidden = to_canonical_card(forbidden, perm)
+        return real_state(solve_lay_down(root_state["remaining"], forbidden), perm)
+    if mode in ("mcts", "ismcts"):
+        if mode == "ismcts":
+            table = None
+        if time_budget is None:
+            time_budget = MCTS_TIME_BUDGET
+        pondered = table.get(state_key(root_state)) if table is not None else None
+        if pondered is not None and pondered.visits >= PONDER_ENOUGH_VISITS:
+            time_budget = min(time_budget, PONDER_TOPUP_BUDGET)
+        hidden = None
+        if mode == "ismcts":
+            if unseen is None:
+                unseen = FULL_DECK & ~root_state["remaining"]
+            else:
+                unseen = to_canonical_mask(unseen, perm)
+            hidden = Determinizations(unseen, to_canonical_mask(opponent, perm), ISMCTS_DETERMINIZATIONS,
+                                      np.random.default_rng(random.getrandbits(64)),
+                                      ISMCTS_OPPONENT_CARDS)
+        if MCTS_WORKERS > 1 and hidden is None:
+            root = parallel_mcts(root_state, start_search_pool(), MCTS_WORKERS,
+                                 iterations=MCTS_ITERATIONS, time_budget=time_budget,
+                                 rollouts=MCTS_ROLLOUTS_PER_LEAF, stats=stats)
+        else:
+            root = mcts(root_state, iterations=MCTS_ITERATIONS, time_budget=time_budget,
+                        rollouts=MCTS_ROLLOUTS_PER_LEAF, table=table, stats=stats,
+                        suspend_gc=MCTS_SUSPEND_GC, hidden=hidden)
+            if table is not None:
+                trim_table(table, root, MCTS_TABLE_LIMIT)
+        final_state = simulate_sequence(root_state, get_best_sequence(root))
+        return real_state(finish_play(root_state, final_state), perm)
+    raise ValueError("Unknown lay-down mode: " + str(mode))
 
-def update_learning_weights(hand_score):
+def lay_down_key(cards, forbidden_discard=None, mode=None):
     """
-    A-3: Adjust learning weights based on hand outcome.
-    For example, if the hand score was very negative, increase the discard penalty.
+    Returns (decision-cache key, perm) for a lay-down. The key is the hand mask in
+    canonical suits (so neither card order nor suit naming matters), the canonical index
+    of the card we may not discard and the lay-down mode. The cache holds decisions in
+    canonical suits; perm maps them back with real_state().
     """
-    global learning_weights
-    if hand_score < -20:
-        learning_weights["discard_penalty"] += 0.1
-    elif hand_score > 20:
-        learning_weights["meld_bonus"] += 0.5
-    logging.info("Updated learning weights: " + str(learning_weights))
+    mask = cards_to_mask(cards)
+    perm = canonical_suits(mask)
+    forbidden = CARD_INDEX.get(forbidden_discard)
+    if forbidden is not None:
+        forbidden = to_canonical_card(forbidden, perm)
+    return (to_canonical_mask(mask, perm), forbidden, mode or LAY_DOWN_MODE), perm
 
+def steer_discard(final_state, cards, forbidden_discard=None):
+    """
+    Re-picks the discard of a chosen lay-down using what the opponent is collecting:
+    among the chosen discard and the cards kept, discards the one that minimizes our
+    deadwood plus DISCARD_INTEREST_WEIGHT points per unit of opponent interest (rank and
+    suit scores from the CardTracker, plus DISCARD_MELD_DANGER if it melds with cards the
+    opponent is known to hold). The forbidden discard is never chosen. Melds are unchanged.
+    """
+    discard = final_state["discard"]
+    if discard is None or not final_state["remaining"] or not DISCARD_INTEREST_WEIGHT:
+        return final_state
+    hand = final_state["remaining"] | CARD_BITS[discard]
+    forbidden = CARD_INDEX.get(forbidden_discard)
+    points = deadwood(hand)
+
+    def cost(card):
+        danger = max(0, cards.interest(card))
+        if can_meld_with(cards.opponent, card):
+            danger += DISCARD_MELD_DANGER
+        return points - CARD_VALUES[card] + DISCARD_INTEREST_WEIGHT * danger
+
+    options = [card for card in iter_cards(hand) if card != forbidden]
+    if not options:
+        return final_state
+    best = min(options, key=cost)
+    if best == discard:
+        return final_state
+    steered = copy_state(final_state)
+    steered["remaining"] = hand & ~CARD_BITS[best]
+    steered["discard"] = best
+    return steered
+
+def honour_forbidden_discard(final_state, cards, forbidden_discard=None):
+    """
+    Makes sure a lay-down never throws back the card just taken from the discard pile.
+    Only the "exact" search honours forbidden_discard itself and steer_discard() can be
+    turned off, so this always runs last: a play that discards the forbidden card is
+    replaced by the exact solver's best play without it.
+    cards: the hand (card strings) the play was chosen for.
+    """
+    forbidden = CARD_INDEX.get(forbidden_discard)
+    if forbidden is None or final_state["discard"] != forbidden:
+        return final_state
+    log_lay_down.info("Replacing a play that discards %s, which was just taken", forbidden_discard)
+    return choose_lay_down(cards, mode="exact", forbidden_discard=forbidden_discard)
+
+def finalize_discard(final_state, cards, hand, forbidden_discard=None):
+    """
+    The discard step every lay-down goes through after its search (or cache hit), in
+    /lay-down/ and the arena alike: steer_discard(), then honour_forbidden_discard().
+    cards: the game's CardTracker. hand: the card strings the play was chosen for.
+    """
+    final_state = steer_discard(final_state, cards, forbidden_discard)
+    return honour_forbidden_discard(final_state, hand, forbidden_discard)
+
+# -------------------- PONDERING --------------------
+# While the opponent plays, the search thread keeps working on the hands we could hold at
+# our next /lay-down/ (our hand plus each card we might draw), writing into the game's
+# transposition table. /lay-down/ then re-roots on the pondered node and only tops it up.
+
+def ponder_hands(session, drawn_card=None):
+    """
+    Returns the hands we might lay down next: our hand plus drawn_card if it is known,
+    otherwise plus each card that is not in our hand, the discard pile or known to be
+    held by the opponent.
+    """
+    if drawn_card is not None:
+        return [session.hand + [drawn_card]]
+    return [session.hand + [CARD_NAMES[card]] for card in iter_cards(session.cards.unseen)]
+
+def ponder(table, hands, budget, cancel):
+    """
+    Round-robins short searches over the candidate hands until the budget is spent, every
+    hand is pondered enough, the table holds MCTS_TABLE_LIMIT nodes, or cancel is set.
+    The limit is checked before every slice, so pondering never grows the table past it.
+    Hands that are suit permutations of each other share one canonical state and are
+    searched once.
+    """
+    deadline = time.perf_counter() + budget
+    roots = (canonical_root_state(h)[0] for h in hands)
+    states = list({state_key(s): s for s in roots}.values())
+    while states and not cancel.is_set():
+        for state in states:
+            remaining = deadline - time.perf_counter()
+            # Each iteration adds at most one node, plus the root if it is new.
+            room = MCTS_TABLE_LIMIT - len(table) - 1
+            if remaining <= 0 or room <= 0 or cancel.is_set():
+                return
+            mcts(state, iterations=room, time_budget=min(PONDER_SLICE, remaining),
+                 rollouts=MCTS_ROLLOUTS_PER_LEAF, table=table, cancel=cancel,
+                 suspend_gc=MCTS_SUSPEND_GC)
+        states = [s for s in states if table[state_key(s)].visits < PONDER_ENOUGH_VISITS]
+
+def cancel_ponder(session):
+    """
+    Cancels the game's ponder job, if any, without waiting for it; also what happens to
+    the job of a session the SessionStore drops. Returns the job's future, or None.
+    """
+    if session.ponder is None:
+        return None
+    future, cancel = session.ponder
+    session.ponder = None
+    cancel.set()
+    ponder_cancels.discard(cancel)
+    future.cancel()
+    return future
 
+async def stop_pondering(session):
+    """
+    Cancels the game's ponder job, if any. A job still queued (behind another game's
+    ponder job, say) is dropped without waiting; a running one is awaited until it lets
+    go of the table.
+    """
+    future = cancel_ponder(session)
+    if future is None or future.cancelled():
+        return
+    try:
+        await asyncio.wrap_future(future)
+    except Exception as e:
+        log_search.error("Pondering failed: %s", e)
+
+async def start_pondering(session, drawn_card=None):
+    """
+    Replaces the game's ponder job with one for its current position. Only runs when
+    single-process MCTS is in use and no real search is waiting.
+    """
+    await stop_pondering(session)
+    if not PONDER or LAY_DOWN_MODE != "mcts" or MCTS_WORKERS > 1 or searches_pending:
+        return
+    hands = ponder_hands(session, drawn_card)
+    if not hands:
+        return
+    cancel = threading.Event()
+    ponder_cancels.add(cancel)
+    future = search_executor.submit(ponder, session.search_table, hands, PONDER_BUDGET, cancel)
+    session.ponder = (future, cancel)
+
+def update_game_history(hand_result, score, game_id=None):
+    """
+    A-2: Update the global game_history with the result of a hand.
+    hand_result: A string or dict describing the outcome of the hand.
+    score: Numeric score (positive for win, negative for loss).
+    game_id: the game the hand belongs to.
+    """
+    try:
+        game_history.record(hand_result, score, game_id)
+    except OSError as e:
+        log_history.error("Could not write hand history: %s", e)
+    log_history.info("Updated game history", extra={"fields": game_history.totals()})
 
 # -------------------- ENDPOINTS --------------------
 
 @app.post("/draw/")
 async def draw(update_info: UpdateInfo):
     """
-    Draw from the discard if it can form a meld with our hand.
-    Otherwise, draw from the stock.
+    Draw from the discard if choose_draw() prefers it. Otherwise, draw from the stock.
     """
     try:
-        global cannot_discard, last_picked_card
-        process_events(update_info.event)
-        discard_card = discard[0] if discard else None
-        last_picked_card = None
-        if discard and can_form_meld(discard[0], hand):
-            cannot_discard = discard[0]
-            last_picked_card = discard[0]
-            logging.info(f"Drawing discard {discard[0]} because it can form a meld with hand: {hand}")
-            print("Drawing discard", discard[0])
+        session = sessions.get(update_info.game_id)
+        if session is None:
+            return unknown_game(update_info.game_id, "/draw/")
+        process_events(session, update_info.event)
+        hand, discard = session.hand, session.discard
+        session.last_picked_card = None
+        if choose_draw(hand, discard, unseen=session.cards.unseen):
+            session.cannot_discard = discard[0]
+            session.last_picked_card = discard[0]
+            log_draw.info("Drawing discard %s", discard[0], extra={"fields": {"game": session.game_id}})
+            await start_pondering(session, drawn_card=discard[0])
             return {"play": "draw discard"}
-        logging.info("No useful discard found. Drawing from stock.")
-        cannot_discard = None
-        last_picked_card = None
-        print("Drawing from stock.")
+        log_draw.info("Drawing from stock", extra={"fields": {"game": session.game_id}})
+        session.cannot_discard = None
+        session.last_picked_card = None
+        await start_pondering(session)
         return {"play": "draw stock"}
     except Exception as e:
-        logging.error("Error in draw endpoint: " + str(e))
+        log_draw.exception("Error in draw endpoint: %s", e)
         return Response("Error in draw", status_code=500)
 
+def choose_draw(hand, discard, opponent_picks=(), mode=None, unseen=None):
+    """
+    Returns True to take the top of the discard pile, False to draw from the stock.
+    mode "ev" takes the discard when it leaves less deadwood after our best lay-down than
+    a stock card would on average (over cards not in our hand, the discard pile or known
+    to be held by the opponent). mode "meld", and "ev" if it fails, use can_form_meld().
+    unseen: mask of the cards a stock draw could be, from the game's CardTracker; if
+    None it is worked out from hand, discard and opponent_picks.
+    """
+    if not discard:
+        return False
+    mode = mode or DRAW_MODE
+    if mode == "ev":
+        try:
+            hand_mask = cards_to_mask(hand)
+            if unseen is None:
+                seen = hand_mask | cards_to_mask(discard) | cards_to_mask(opponent_picks)
+                unseen = FULL_DECK & ~seen
+            take, stock = draw_deadwoods(hand_mask, CARD_INDEX[discard[0]], unseen)
+            return stock is None or take < stock
+        except (KeyError, ValueError) as e:
+            log_draw.warning("Expected-value draw failed, falling back to can_form_meld: %s", e)
+    return can_form_meld(discard[0], hand)
+
 def can_form_meld(card, hand_list):
     """
     Check if the given card can form a meld with the given hand.
@@ -406,81 +1155,100 @@ async def lay_down(update_info: UpdateInfo):
     Game Server calls this endpoint to conclude player's turn with melding and/or discard.
     """
     try:
-        global hand
-        process_events(update_info.event)
-        print("Starting lay-down with hand:", hand)
-        logging.info("Starting lay-down with hand: " + str(hand))
-        root_state = {
-            "remaining": hand.copy(),
-            "melds": [],
-            "discard": None,
-            "finished": False
-        }
-        root = mcts(root_state, iterations=1000)
-        best_sequence = get_best_sequence(root)
-        final_state = simulate_sequence(root_state, best_sequence)
+        session = sessions.get(update_info.game_id)
+        if session is None:
+            return unknown_game(update_info.game_id, "/lay-down/")
+        await stop_pondering(session)
+        process_events(session, update_info.event)
+        hand = list(session.hand)
+        started = time.perf_counter()
+        stats = {}
+        key, perm = lay_down_key(hand, session.cannot_discard)
+        # "ismcts" decisions depend on what we know about hidden cards, not just the hand.
+        cacheable = LAY_DOWN_MODE != "ismcts"
+        cached = lay_down_cache.get(key) if cacheable else None
+        if cached is None:
+            final_state = await run_search(choose_lay_down, hand, forbidden_discard=session.cannot_discard,
+                                           time_budget=update_info.time_budget,
+                                           table=session.search_table, stats=stats,
+                                           unseen=session.cards.unseen, opponent=session.cards.opponent)
+            # Only finished plays searched with at least the default budget are reused:
+            # the key does not record the budget a request asked for.
+            if (cacheable and final_state["finished"] and final_state["discard"] is not None
+                    and (update_info.time_budget is None or update_info.time_budget >= MCTS_TIME_BUDGET)):
+                lay_down_cache.put(key, canonical_state(final_state, perm))
+            record_search(stats)
+        else:
+            final_state = real_state(cached, perm)
+            stats["cached"] = True
+        final_state = finalize_discard(final_state, session.cards, hand, session.cannot_discard)
+        elapsed_ms = (time.perf_counter() - started) * 1000
         play_string = build_play_string(final_state)
-        logging.info("MCTS chose play: " + play_string)
-        print("MCTS play string:", play_string)
-        # Update our global hand by removing melded and discarded cards.
-        meld_cards = [card for meld in final_state["melds"] for card in meld]
-        for card in meld_cards:
-            if card in hand:
-                hand.remove(card)
-        if final_state["finished"] and final_state["discard"] in hand:
-            hand.remove(final_state["discard"])
+        log_lay_down.info("%s chose play: %s", LAY_DOWN_MODE, play_string, extra={"fields": {
+            "game": session.game_id, "hand": hand, "ms": round(elapsed_ms, 2), **stats}})
+        # Update the game's hand by removing melded and discarded cards.
+        session.hand = sorted(mask_to_cards(final_state["remaining"]))
+        session.cards.laid_down(final_state["remaining"], final_state["discard"])
+        await start_pondering(session)
         return {"play": play_string}
+    except SearchOverloaded as e:
+        log_lay_down.warning("Rejected lay-down: %s", e)
+        return Response("Search queue full", status_code=503)
     except Exception as e:
-        logging.error("Error in lay-down endpoint: " + str(e))
+        log_lay_down.exception("Error in lay-down endpoint: %s", e)
         return Response("Error in lay-down", status_code=500)
 
 @app.post("/update-2p-game/")
 async def update_2p_game(update_info: UpdateInfo):
     try:
-        process_events(update_info.event)
-        logging.info("Game update: " + update_info.event)
-        # If the event indicates the end of a hand, update game history and learning.
+        session = sessions.get(update_info.game_id)
+        if session is None:
+            return unknown_game(update_info.game_id, "/update-2p-game/")
+        process_events(session, update_info.event)
+        log_game.info("Game update", extra={"fields": {"game": session.game_id, "event": update_info.event}})
         if " Ends:" in update_info.event:
+            # If the event indicates the end of a hand, update game history.
+            await stop_pondering(session)
             # For demonstration, we derive a hand score using the current evaluation
             # (In practice, you may extract a score from the event details.)
-            current_state = {
-                "remaining": hand.copy(),
-                "melds": [],
-                "discard": None,
-                "finished": True
-            }
             try:
-                hand_score = evaluate_state(current_state)
+                hand_score = score_deadwood(deadwood(cards_to_mask(session.hand)))
             except Exception:
                 hand_score = -1000
-            update_game_history(update_info.event, hand_score)
-            update_learning_weights(hand_score)
+            update_game_history(update_info.event, hand_score, session.game_id)
+        elif session.ponder is None:
+            # Otherwise search ahead in the background until our next request.
+            await start_pondering(session)
         return {"status": "OK"}
     except Exception as e:
-        logging.error("Error in update-2p-game endpoint: " + str(e))
+        log_game.exception("Error in update-2p-game endpoint: %s", e)
         return Response("Error in update-2p-game", status_code=500)
 
 @app.get("/shutdown")
 async def shutdown_API():
     os.kill(os.getpid(), signal.SIGTERM)
-    logging.info("Player client shutting down...")
+    log_game.info("Player client shutting down...")
     return Response(status_code=200, content='Server shutting down...')
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Added after every route so the middleware knows the endpoint paths.
+app.add_middleware(RequestMetrics, requests=http_requests, latency=http_latency,
+                   paths=[route.path for route in app.routes])
+
 # -------------------- MAIN --------------------
 
 if __name__ == "__main__":
     if DEBUG:
         url = "http://127.0.0.1:16200/test"
-        logging.basicConfig(filename="RummyPlayer.log",
-                            format='%(asctime)s - %(levelname)s - %(message)s',
-                            datefmt='%Y-%m-%d %H:%M:%S',
-                            level=logging.INFO)
     else:
         url = "http://127.0.0.1:16200/register"
-        logging.basicConfig(filename="RummyPlayer.log",
-                            format='%(asctime)s - %(levelname)s - %(message)s',
-                            datefmt='%Y-%m-%d %H:%M:%S',
-                            level=logging.WARNING)
+    log_listener = setup_logging(LOG_FILE, level=logging.INFO if DEBUG else logging.WARNING,
+                                 category_levels=LOG_CATEGORY_LEVELS, sample_rates=LOG_SAMPLE_RATES,
+                                 max_chars=LOG_RECORD_LIMIT, console=DEBUG)
+    log_history.info("Evaluator weights v%d", weights_version, extra={"fields": learning_weights})
     payload = {
         "name": USER_NAME,
         "address": "127.0.0.1",
@@ -498,4 +1266,8 @@ if __name__ == "__main__":
         print("Request failed with status:", response.status_code)
         print("Response:", response.text)
         exit(1)
+    if MCTS_WORKERS > 1:
+        start_search_pool()
     uvicorn.run(app, host="127.0.0.1", port=PORT)
+    log_listener.stop()
+    game_history.close()
@@ -0,0 +1,144 @@
+"""
+In-process metrics for the player, rendered in the Prometheus text exposition format
+by the /metrics endpoint in main4.py.
+
+Recording is a dict lookup and a few additions: no locks, no I/O and no formatting on
+the request path. Values are only turned into text when /metrics is scraped. Gauges and
+counters can also be callbacks, so state the server already keeps (loop lag, table
+sizes, cache hit counts) costs nothing until a scrape reads it.
+"""
+import bisect
+import time
+
+# Seconds; covers fast handlers up to a full MCTS budget.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Monotonic count, optionally split by label values: counter.inc("/draw/", "200").
+    With fn, the value is fn() read at scrape time; it should only grow, as a drop reads
+    as a counter reset.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        self.name, self.help, self.labels, self.fn = name, help, tuple(labels), fn
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        if self.fn is not None:
+            yield self.name, self.fn()
+            return
+        for label_values, value in self.values.items():
+            yield self.name + _format_labels(self.labels, label_values), value
+
+
+class Gauge:
+    """
+    Value that goes up and down. With fn, the value is fn() read at scrape time.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        self.name, self.help, self.labels, self.fn = name, help, tuple(labels), fn
+        self.values = {}
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def samples(self):
+        if self.fn is not None:
+            yield self.name, self.fn()
+            return
+        for label_values, value in self.values.items():
+            yield self.name + _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observe() bisects the upper bounds and bumps one count.
+    Buckets are rendered cumulatively, with +Inf, _sum and _count, as Prometheus expects.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}     # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for label_values, series in self.values.items():
+            names = self.labels + ("le",)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(names, label_values + (bound,)), cumulative
+            labels = _format_labels(self.labels, label_values)
+            yield self.name + "_sum" + labels, series[-1]
+            yield self.name + "_count" + labels, cumulative
+
+
+class Registry:
+    """
+    Ordered collection of metrics that renders them all as exposition text.
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """
+    ASGI middleware that counts requests by path and status and times them by path.
+    Paths outside `paths` are counted as "other" so stray URLs cannot grow the label set.
+    """
+    def __init__(self, app, requests, latency, paths):
+        self.app, self.requests, self.latency, self.paths = app, requests, latency, frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            path = scope["path"] if scope["path"] in self.paths else "other"
+            self.requests.inc(path, str(status[0]))
+            self.latency.observe(time.perf_counter() - started, path)
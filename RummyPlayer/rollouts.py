@@ -0,0 +1,121 @@
+"""
+Batched random rollouts with NumPy.
+
+Plays many random playouts at once with the same policy as simulate() in main4.py
+with MCTS_PRUNE_MOVES off (mcts() only batches rollouts then): at every step each
+hand picks uniformly among its maximal melds and "finish with this discard" moves,
+until it discards. Hands are boolean arrays of shape (N, 4, 13)
+(suit, rank), so meld detection and deadwood scoring are array operations over the
+whole batch instead of Python loops per playout.
+"""
+import numpy as np
+
+from cards import NUM_CARDS, NUM_RANKS, SUITS
+from evaluator import DEFAULT_WEIGHTS, HIGH_RANK, weight_vector
+
+NUM_SUITS = len(SUITS)
+RANK_VALUES = np.arange(NUM_RANKS) + 2            # card_value(): 2..9, T=10 ... A=14
+CARD_VALUE_GRID = np.broadcast_to(RANK_VALUES, (NUM_SUITS, NUM_RANKS))
+_RANK_INDEX = np.arange(NUM_RANKS)
+_BIT_SHIFTS = np.arange(NUM_CARDS, dtype=np.uint64)
+
+# Move columns: one set per rank, one run per (suit, last rank), one finish per card.
+SET_MOVES = NUM_RANKS
+RUN_MOVES = NUM_CARDS
+NUM_MOVES = SET_MOVES + RUN_MOVES + NUM_CARDS
+
+NO_MOVES_REWARD = -1000    # same as simulate() when a hand runs out of cards
+
+
+def masks_to_array(masks):
+    """
+    Converts hand bitmasks (cards.py encoding) into a boolean (N, 4, 13) array.
+    """
+    words = np.asarray(masks, dtype=np.uint64).reshape(-1, 1)
+    bits = (words >> _BIT_SHIFTS) & np.uint64(1)
+    return bits.astype(bool).reshape(-1, NUM_SUITS, NUM_RANKS)
+
+
+def score_hands(kept, weights):
+    """
+    Vectorized evaluator.score_hand() over a boolean (M, 4, 13) array of kept cards.
+    """
+    count = kept.sum(axis=(1, 2))
+    points = (kept * CARD_VALUE_GRID).sum(axis=(1, 2))
+    high = kept[..., HIGH_RANK:].sum(axis=(1, 2))
+    return np.where(count == 0, weights[0],
+                    -(weights[1] * count + weights[2] * points + weights[3] * high))
+
+
+def _run_labels(hands):
+    """
+    For every card, the rank at which its stretch of consecutive cards in the suit starts
+    (only meaningful where the card is held).
+    """
+    previous = np.zeros_like(hands)
+    previous[..., 1:] = hands[..., :-1]
+    starts = np.where(hands & ~previous, _RANK_INDEX, -1)
+    return np.maximum.accumulate(starts, axis=-1)
+
+
+def batch_rollouts(hands, rng, weights=None):
+    """
+    Plays one random rollout per hand and returns the rewards as a float array.
+    hands: boolean (N, 4, 13) array; it is modified in place.
+    rng: numpy Generator.
+    weights: evaluator.weight_vector() tuple; the default weights if None.
+    """
+    if weights is None:
+        weights = weight_vector(DEFAULT_WEIGHTS)
+    n = hands.shape[0]
+    rewards = np.full(n, float(NO_MOVES_REWARD))
+    active = np.arange(n)
+    while active.size:
+        h = hands[active]
+        # Maximal sets: every rank held in 3+ suits.
+        set_valid = h.sum(axis=1) >= 3
+        # Maximal runs, keyed by their last card: a held card whose successor is not held
+        # and whose stretch started at least two ranks earlier.
+        labels = _run_labels(h)
+        following = np.zeros_like(h)
+        following[..., :-1] = h[..., 1:]
+        run_valid = h & ~following & (_RANK_INDEX - labels >= 2)
+        valid = np.concatenate(
+            (set_valid, run_valid.reshape(-1, RUN_MOVES), h.reshape(-1, NUM_CARDS)), axis=1)
+        has_move = valid.any(axis=1)
+        # Uniform choice among each row's valid moves.
+        keys = rng.random((active.size, NUM_MOVES))
+        keys[~valid] = -1.0
+        choice = keys.argmax(axis=1)
+        rows = np.arange(active.size)
+
+        is_set = has_move & (choice < SET_MOVES)
+        if is_set.any():
+            h[rows[is_set], :, choice[is_set]] = False
+
+        is_run = has_move & (choice >= SET_MOVES) & (choice < SET_MOVES + RUN_MOVES)
+        if is_run.any():
+            run_rows = rows[is_run]
+            suit, last = np.divmod(choice[is_run] - SET_MOVES, NUM_RANKS)
+            run_start = labels[run_rows, suit, last]
+            in_run = (labels[run_rows, suit] == run_start[:, None]) & h[run_rows, suit]
+            h[run_rows, suit] &= ~in_run
+
+        is_finish = has_move & (choice >= SET_MOVES + RUN_MOVES)
+        if is_finish.any():
+            finish_rows = rows[is_finish]
+            suit, rank = np.divmod(choice[is_finish] - SET_MOVES - RUN_MOVES, NUM_RANKS)
+            h[finish_rows, suit, rank] = False
+            rewards[active[finish_rows]] = score_hands(h[finish_rows], weights)
+
+        hands[active] = h
+        active = active[has_move & ~is_finish]
+    return rewards
+
+
+def rollout_mean(mask, count, rng, weights=None):
+    """
+    Mean reward of `count` random rollouts from the hand bitmask `mask`.
+    """
+    hands = np.repeat(masks_to_array([mask]), count, axis=0)
+    return float(batch_rollouts(hands, rng, weights).mean())
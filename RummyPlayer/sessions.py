@@ -0,0 +1,114 @@
+"""
+Per-game state for the player, so one process can play many games at once.
+Every update from the game server carries a game_id; the handlers in main4.py look the
+game up here instead of reading module-level globals.
+"""
+import time
+from collections import OrderedDict, deque
+
+from cards import cards_to_mask
+from tracker import CardTracker
+
+
+class GameSession:
+    """
+    State of one game.
+    hand: sorted list of cards in our hand.
+    discard: deque of cards organized as a stack (top card first).
+    cannot_discard: card we took from the discard this turn and may not throw back.
+    last_picked_card: card taken from the discard on our last draw, if any.
+    opponent_name: the opponent's name from /start-2p-game/.
+    cards: CardTracker of what we know about every card in the current hand.
+    search_table: MCTS transposition table kept between turns of the current hand.
+    ponder: (future, cancel event) of the background search on this game, or None.
+    last_used: time.monotonic() of the last request for this game.
+    """
+    __slots__ = ("game_id", "hand", "discard", "cannot_discard", "last_picked_card",
+                 "opponent_name", "cards", "search_table", "ponder", "last_used")
+
+    def __init__(self, game_id, opponent_name=None):
+        self.game_id = game_id
+        self.hand = []
+        self.discard = deque()
+        self.cannot_discard = ""
+        self.last_picked_card = ""
+        self.opponent_name = opponent_name
+        self.cards = CardTracker()
+        self.search_table = {}
+        self.ponder = None
+        self.last_used = time.monotonic()
+
+    def start_hand(self, cards):
+        self.hand = sorted(cards)
+        self.discard = deque()
+        self.cannot_discard = ""
+        self.last_picked_card = ""
+        self.cards = CardTracker(cards_to_mask(self.hand))
+        self.search_table = {}
+
+
+class SessionStore:
+    """
+    Live GameSessions keyed by game_id, least recently used first.
+    Sessions idle for longer than idle_timeout seconds are dropped, and starting a game
+    beyond max_sessions evicts the least recently used one. Only start() creates sessions.
+    on_evict(session), if given, is called for every session dropped or replaced (main4
+    cancels its ponder job there).
+    """
+    def __init__(self, max_sessions=64, idle_timeout=600.0, on_evict=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        self.sessions = OrderedDict()
+        self.latest_game_id = None
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def start(self, game_id, opponent_name=None):
+        """
+        Creates (or replaces) the session for game_id and returns it.
+        """
+        self.evict_idle()
+        replaced = self.sessions.pop(game_id, None)
+        if replaced is not None and self.on_evict is not None:
+            self.on_evict(replaced)
+        while len(self.sessions) >= self.max_sessions:
+            self._evict_oldest()
+        session = self.sessions[game_id] = GameSession(game_id, opponent_name)
+        self.latest_game_id = game_id
+        return session
+
+    def get(self, game_id=None):
+        """
+        Returns the session for game_id (the most recently started game if None), or None
+        if the game is unknown: a stray id must not create a session, let alone evict a
+        live game to make room for one.
+        """
+        if game_id is None:
+            game_id = self.latest_game_id
+        session = self.sessions.get(game_id)
+        if session is None:
+            return None
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(game_id)
+        self.evict_idle()
+        return session
+
+    def evict_idle(self):
+        """
+        Drops sessions that have not been used for idle_timeout seconds.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, session = self.sessions.popitem(last=False)
+        self.evicted += 1
+        if self.on_evict is not None:
+            self.on_evict(session)
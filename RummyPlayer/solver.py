@@ -0,0 +1,106 @@
+"""
+Exact lay-down solver.
+
+Choosing the melds and discard that minimise deadwood is deterministic, so instead of
+sampling it with MCTS this module solves it outright: a memoized search over the cards
+still unmelded, always branching on the lowest card (it is either deadwood or part of a
+meld that contains it), then the discard that leaves the least deadwood behind.
+"""
+from cards import CARD_BITS, CARD_VALUES, can_meld_with, candidate_melds, iter_cards
+
+
+def _make_solver(hand):
+    """
+    Returns solve(mask) -> (deadwood, melds) for subsets of hand, sharing one memo so
+    trying each possible discard reuses the work done for the others.
+    """
+    by_card = {}
+    for meld in candidate_melds(hand):
+        for card in iter_cards(meld):
+            by_card.setdefault(card, []).append(meld)
+    memo = {0: (0, ())}
+
+    def solve(mask):
+        if mask in memo:
+            return memo[mask]
+        low = mask & -mask
+        card = low.bit_length() - 1
+        # Either the lowest card stays as deadwood...
+        rest_points, rest_melds = solve(mask ^ low)
+        best = (rest_points + CARD_VALUES[card], rest_melds)
+        # ...or it is covered by one of the melds that contain it.
+        for meld in by_card.get(card, ()):
+            if meld & mask == meld:
+                points, melds = solve(mask & ~meld)
+                if points < best[0]:
+                    best = (points, (meld,) + melds)
+        memo[mask] = best
+        return best
+
+    return solve
+
+
+def _least_after_discard(solve, hand, cannot_discard=None):
+    """
+    Least deadwood left after melding hand and discarding one card other than cannot_discard.
+    """
+    return min(solve(hand & ~CARD_BITS[card]) for card in iter_cards(hand) if card != cannot_discard)[0]
+
+
+def draw_deadwoods(hand, top_discard, unseen):
+    """
+    Compares the two draws. Returns (take, stock):
+    take: least deadwood after taking top_discard and laying down (it may not be thrown back).
+    stock: the same for drawing from the stock, averaged over the unseen cards.
+    hand, unseen: bitmasks; top_discard: card index.
+    Cards that cannot meld with the hand are scored from two values shared by all of
+    them, so the solver only runs for the few cards that can.
+    """
+    solve = _make_solver(hand | unseen | CARD_BITS[top_discard])
+    take = _least_after_discard(solve, hand | CARD_BITS[top_discard], top_discard)
+    if not unseen:
+        return take, None
+    # A drawn card that melds with nothing either goes straight back out (leaving the
+    # hand's own best) or stays as deadwood while the best card of the hand is discarded.
+    keep_hand = solve(hand)[0]
+    drop_one = _least_after_discard(solve, hand)
+    total = 0
+    for card in iter_cards(unseen):
+        if can_meld_with(hand, card):
+            total += _least_after_discard(solve, hand | CARD_BITS[card])
+        else:
+            total += min(keep_hand, drop_one + CARD_VALUES[card])
+    return take, total / unseen.bit_count()
+
+
+def solve_lay_down(hand, cannot_discard=None):
+    """
+    Returns the final search state (same shape as main4's MCTS states) for the play that
+    leaves the least deadwood after melding and discarding one card.
+    hand: bitmask of the cards held.
+    cannot_discard: card index that may not be discarded this turn, or None.
+    """
+    if not hand:
+        raise ValueError("Cannot lay down an empty hand")
+    solve = _make_solver(hand)
+    best = None
+    for card in iter_cards(hand):
+        if card == cannot_discard:
+            continue
+        points, melds = solve(hand & ~CARD_BITS[card])
+        if best is None or points < best[0]:
+            best = (points, melds, card)
+    if best is None:
+        # Only the forbidden card is left, so there is nothing else to discard.
+        points, melds = solve(0)
+        best = (points, melds, cannot_discard)
+    points, melds, discard = best
+    remaining = hand & ~CARD_BITS[discard]
+    for meld in melds:
+        remaining &= ~meld
+    return {
+        "remaining": remaining,
+        "melds": melds,
+        "discard": discard,
+        "finished": True
+    }
@@ -0,0 +1,51 @@
+"""
+Checks of the bitmask card helpers in cards.py: the meld index against the list-based
+get_valid_melds() it replaced (kept in main3.py), and the suit canonicalization used by
+the searches and the decision cache. Run from the RummyPlayer directory: python -m pytest
+"""
+import itertools
+import random
+
+from cards import (CARD_NAMES, NUM_CARDS, canonical_suits, cards_to_mask, from_canonical_card,
+                   from_canonical_mask, to_canonical_card, to_canonical_mask, valid_meld_masks)
+import main3
+
+PERMUTATIONS = list(itertools.permutations(range(4)))
+
+
+def random_masks(count, seed=432):
+    rng = random.Random(seed)
+    return [cards_to_mask(rng.sample(CARD_NAMES, rng.randint(3, 20))) for _ in range(count)]
+
+
+def test_valid_meld_masks_match_list_implementation():
+    rng = random.Random(432)
+    for _ in range(500):
+        cards = rng.sample(CARD_NAMES, rng.randint(3, 20))
+        expected = {cards_to_mask(meld) for meld in main3.get_valid_melds(cards)}
+        found = valid_meld_masks(cards_to_mask(cards))
+        assert len(found) == len(expected)
+        assert set(found) == expected
+
+
+def test_canonical_mask_round_trips():
+    for mask in random_masks(200):
+        for perm in [canonical_suits(mask)] + PERMUTATIONS:
+            assert from_canonical_mask(to_canonical_mask(mask, perm), perm) == mask
+            assert to_canonical_mask(from_canonical_mask(mask, perm), perm) == mask
+
+
+def test_canonical_card_round_trips():
+    for perm in PERMUTATIONS:
+        for card in range(NUM_CARDS):
+            assert from_canonical_card(to_canonical_card(card, perm), perm) == card
+            mapped = to_canonical_card(card, perm)
+            assert to_canonical_mask(1 << card, perm) == 1 << mapped
+
+
+def test_suit_permutations_share_one_canonical_mask():
+    for mask in random_masks(100):
+        canonical = to_canonical_mask(mask, canonical_suits(mask))
+        for perm in PERMUTATIONS:
+            relabelled = to_canonical_mask(mask, perm)
+            assert to_canonical_mask(relabelled, canonical_suits(relabelled)) == canonical
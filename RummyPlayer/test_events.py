@@ -0,0 +1,67 @@
+"""
+Checks of the event tokenizer in events.py and of process_events() in main4.py, which
+applies the parsed events to a game's session.
+Run from the RummyPlayer directory: python -m pytest
+"""
+import pytest
+
+from cards import CARD_INDEX, cards_to_mask
+from events import DISCARD, DRAW, HAND_END, TAKE, is_player, parse_event, parse_events
+from sessions import GameSession
+from tracker import DISCARD_INTEREST, TAKE_INTEREST
+import main4
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("nakai draws 5H", (DRAW, "nakai", "5H")),
+    ("nakai takes KD", (TAKE, "nakai", "KD")),
+    ("bob discards 2C", (DISCARD, "bob", "2C")),
+    ("Player bob takes 9S", (TAKE, "Player bob", "9S")),
+    ("bob  discards  TD  ", (DISCARD, "bob", "TD")),
+    ("Hand Ends: nakai wins 23", (HAND_END, None, "Hand Ends: nakai wins 23")),
+    ("bob draws", None),              # an opponent's stock draw names no card
+    ("drawsy 5H", None),
+    ("Game starts", None),
+    ("", None),
+])
+def test_parse_event(line, expected):
+    assert parse_event(line) == expected
+
+
+def test_parse_events_keeps_order_and_skips_other_lines():
+    text = "bob draws\nbob discards 2C\n\nnakai takes 2C\nnakai discards 9H"
+    assert parse_events(text) == [(DISCARD, "bob", "2C"), (TAKE, "nakai", "2C"),
+                                  (DISCARD, "nakai", "9H")]
+
+
+@pytest.mark.parametrize("player, name, expected", [
+    ("bob", "bob", True),
+    ("Player bob", "bob", True),
+    ("bobby", "bob", False),
+    ("bob2", "bob", False),
+    ("jimbob", "bob", False),
+    ("bob", "", False),
+    ("bob", None, False),
+])
+def test_is_player(player, name, expected):
+    assert is_player(player, name) == expected
+
+
+def test_process_events_updates_hand_pile_and_tracker():
+    session = GameSession("g", opponent_name="bob")
+    session.start_hand("2C 3C 4C 5D 6D 7D 9S TS 2H 3S".split())
+    me = main4.USER_NAME
+    main4.process_events(session, "\n".join([
+        "bob draws", "bob discards KH",
+        f"{me} takes KH", f"{me} discards 9S",
+        "bob takes 9S", "bob discards 4H",
+        f"{me} draws 8D", f"{me} discards TS",
+    ]))
+    assert session.hand == sorted("2C 3C 4C 5D 6D 7D 8D 9S TS 2H 3S KH".split())
+    assert list(session.discard) == ["TS", "4H"]
+    cards = session.cards
+    assert cards.hand == cards_to_mask("2C 3C 4C 5D 6D 7D 8D 2H 3S KH".split())
+    assert cards.discard == cards_to_mask(["TS", "4H"])
+    assert cards.opponent == cards_to_mask(["9S"])
+    assert cards.interest(CARD_INDEX["9S"]) == 2 * TAKE_INTEREST
+    assert cards.interest(CARD_INDEX["KH"]) == -3 * DISCARD_INTEREST
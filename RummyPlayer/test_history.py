@@ -0,0 +1,67 @@
+"""
+Checks of the on-disk hand history in history.py: segment rollover, recovery from a line
+torn by a crash, and totals rebuilt when the history is reopened.
+Run from the RummyPlayer directory: python -m pytest
+"""
+import json
+import os
+
+from history import HandHistory
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().split("\n")
+
+
+def test_segments_roll_over(tmp_path):
+    history = HandHistory(str(tmp_path), segment_records=3)
+    for i in range(7):
+        history.record("Hand Ends", i, game_id="g")
+    history.close()
+    segments = history.segments()
+    assert [os.path.basename(path) for path in segments] == [
+        "hands-000001.jsonl", "hands-000002.jsonl", "hands-000003.jsonl"]
+    assert [len(read_lines(path)) - 1 for path in segments] == [3, 3, 1]
+    assert [record["score"] for record in history.iter_hands()] == list(range(7))
+
+
+def test_reopen_rebuilds_totals_and_continues_segment(tmp_path):
+    history = HandHistory(str(tmp_path), recent=2, segment_records=4)
+    for score in (10, -5, 0, 7, 3):
+        history.record("Hand Ends", score, game_id="a" if score > 0 else "b")
+    history.close()
+
+    reopened = HandHistory(str(tmp_path), recent=2, segment_records=4)
+    assert reopened.totals() == history.totals() == {
+        "hands_played": 5, "hands_won": 3, "total_score": 15, "win_rate": 0.6}
+    assert [record["score"] for record in reopened.recent] == [7, 3]
+    assert reopened.summarize("b") == {"hands_played": 2, "hands_won": 0,
+                                       "total_score": -5, "win_rate": 0.0}
+
+    # The second segment holds one hand, so the next three fill it before a third starts.
+    for score in (1, 2, 3, 4):
+        reopened.record("Hand Ends", score)
+    reopened.close()
+    assert len(reopened.segments()) == 3
+    assert reopened.hands_played == 9
+
+
+def test_torn_line_is_skipped_and_not_appended_to(tmp_path):
+    history = HandHistory(str(tmp_path))
+    history.record("Hand Ends", 4, game_id="g")
+    history.close()
+    path = history.segments()[0]
+    with open(path, "a") as f:
+        f.write('{"time": 1, "game": "g", "res')       # a crash mid-write
+
+    reopened = HandHistory(str(tmp_path))
+    assert reopened.hands_played == 1
+    reopened.record("Hand Ends", -2, game_id="g")
+    reopened.close()
+
+    lines = read_lines(path)
+    assert lines[-1] == ""
+    assert json.loads(lines[-2])["score"] == -2
+    assert [record["score"] for record in reopened.iter_hands()] == [4, -2]
+    assert HandHistory(str(tmp_path)).totals()["hands_played"] == 2
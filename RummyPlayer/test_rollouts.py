@@ -0,0 +1,32 @@
+"""
+Checks that the batched NumPy rollouts play the same policy as the scalar playout in
+main4.py (with MCTS_PRUNE_MOVES off, the only policy they implement): from the same hand
+both must reach the same mean reward. Run from the RummyPlayer directory: python -m pytest
+"""
+import random
+
+import numpy as np
+
+from cards import CARD_NAMES, cards_to_mask
+from rollouts import batch_rollouts, masks_to_array
+import main4
+
+ROLLOUTS = 4000
+TOLERANCE = 3.0     # points; the standard error of the difference is about 1
+
+
+def test_batched_rollouts_match_scalar_playout(monkeypatch):
+    monkeypatch.setattr(main4, "MCTS_PRUNE_MOVES", False)
+    hands = ["2C 3C 4C 5C 9D 9H 9S KD 7H 2S JC",
+             "2C 3C 4C 5D 6D 7D 9S TS 2H 3S KH",
+             "AC AD AH AS 2D 3D 4D 5D 8C 8H 8S"]
+    rng = random.Random(432)
+    hands += [" ".join(rng.sample(CARD_NAMES, 11)) for _ in range(3)]
+    random.seed(432)
+    np_rng = np.random.default_rng(432)
+    for hand in hands:
+        mask = cards_to_mask(hand.split())
+        scalar = sum(main4.playout(mask) for _ in range(ROLLOUTS)) / ROLLOUTS
+        batch = batch_rollouts(np.repeat(masks_to_array([mask]), ROLLOUTS, axis=0), np_rng,
+                               main4.eval_weights)
+        assert abs(scalar - batch.mean()) < TOLERANCE, hand
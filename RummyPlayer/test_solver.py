@@ -0,0 +1,87 @@
+"""
+Checks solver.solve_lay_down() against an exhaustive search over every packing of
+disjoint melds (maximal or not) and every discard, on seeded hands, and
+solver.draw_deadwoods() against solving every possible draw outright.
+Run from the RummyPlayer directory: python -m pytest
+"""
+import random
+
+from cards import CARD_BITS, CARD_NAMES, MELDS, candidate_melds, cards_to_mask, deadwood, iter_cards
+from solver import draw_deadwoods, solve_lay_down
+
+HAND_SIZE = 11
+
+
+def seeded_hands(count, seed=432):
+    """
+    Random deals, and as many hands built around two or three disjoint melds.
+    """
+    rng = random.Random(seed)
+    hands = [cards_to_mask(rng.sample(CARD_NAMES, HAND_SIZE)) for _ in range(count)]
+    while len(hands) < 2 * count:
+        mask = 0
+        for meld in rng.sample(MELDS, 3):
+            if not meld & mask and (mask | meld).bit_count() <= HAND_SIZE - 1:
+                mask |= meld
+        rest = [card for card in range(len(CARD_NAMES)) if not CARD_BITS[card] & mask]
+        for card in rng.sample(rest, HAND_SIZE - mask.bit_count()):
+            mask |= CARD_BITS[card]
+        hands.append(mask)
+    return hands
+
+
+def least_deadwood(cards, melds, start=0):
+    best = deadwood(cards)
+    for i in range(start, len(melds)):
+        if melds[i] & cards == melds[i]:
+            best = min(best, least_deadwood(cards & ~melds[i], melds, i + 1))
+    return best
+
+
+def brute_force(hand, cannot_discard=None):
+    melds = candidate_melds(hand)
+    return min(least_deadwood(hand & ~CARD_BITS[card], melds)
+               for card in iter_cards(hand) if card != cannot_discard)
+
+
+def check_play(hand, state, cannot_discard=None):
+    discard = state["discard"]
+    assert discard != cannot_discard
+    assert hand & CARD_BITS[discard]
+    used = CARD_BITS[discard] | state["remaining"]
+    for meld in state["melds"]:
+        assert meld in MELDS
+        assert not meld & used
+        used |= meld
+    assert used == hand
+
+
+def test_solver_matches_brute_force():
+    for hand in seeded_hands(60):
+        state = solve_lay_down(hand)
+        check_play(hand, state)
+        assert deadwood(state["remaining"]) == brute_force(hand)
+
+
+def test_solver_honours_cannot_discard():
+    rng = random.Random(433)
+    for hand in seeded_hands(30, seed=433):
+        forbidden = rng.choice(list(iter_cards(hand)))
+        state = solve_lay_down(hand, forbidden)
+        check_play(hand, state, forbidden)
+        assert deadwood(state["remaining"]) == brute_force(hand, forbidden)
+
+
+def test_draw_deadwoods_match_solving_every_draw():
+    rng = random.Random(434)
+    for _ in range(40):
+        cards = rng.sample(range(len(CARD_NAMES)), 30)
+        hand = sum(CARD_BITS[card] for card in cards[:10])
+        top = cards[10]
+        unseen = sum(CARD_BITS[card] for card in cards[11:])
+        take, stock = draw_deadwoods(hand, top, unseen)
+        assert take == deadwood(solve_lay_down(hand | CARD_BITS[top], top)["remaining"])
+        expected = sum(deadwood(solve_lay_down(hand | CARD_BITS[card])["remaining"])
+                       for card in iter_cards(unseen)) / unseen.bit_count()
+        assert abs(stock - expected) < 1e-9
+    assert draw_deadwoods(hand, top, 0)[1] is None
@@ -0,0 +1,78 @@
+"""
+Checks of the card tracker in tracker.py: across seeded hands of play, its five masks
+partition the deck and agree with where the cards really are.
+Run from the RummyPlayer directory: python -m pytest
+"""
+import random
+
+from cards import FULL_DECK, NUM_CARDS, cards_to_mask
+from tracker import CardTracker
+
+
+def mask(cards):
+    return sum(1 << card for card in cards)
+
+
+def check(tracker, hand, pile, opponent, stock):
+    parts = [tracker.hand, tracker.discard, tracker.opponent, tracker.dead, tracker.unseen]
+    for i, part in enumerate(parts):
+        for other in parts[i + 1:]:
+            assert part & other == 0
+    assert parts[0] | parts[1] | parts[2] | parts[3] | parts[4] == FULL_DECK
+    assert tracker.hand == mask(hand)
+    assert tracker.discard == mask(pile)
+    assert tracker.opponent & ~mask(opponent) == 0
+    assert tracker.unseen & mask(stock) == mask(stock)
+
+
+def test_tracker_partitions_the_deck():
+    rng = random.Random(432)
+    for _ in range(50):
+        deck = list(range(NUM_CARDS))
+        rng.shuffle(deck)
+        hand, opponent, pile, stock = deck[:10], deck[10:20], [deck[20]], deck[21:]
+        tracker = CardTracker(mask(hand))
+        tracker.discarded(pile[-1], by_opponent=False)
+        check(tracker, hand, pile, opponent, stock)
+        while stock:
+            # Opponent's turn: take the top of the pile or draw blind, then discard.
+            if pile and rng.random() < 0.4:
+                card = pile.pop()
+                opponent.append(card)
+                tracker.opponent_takes(card)
+            else:
+                opponent.append(stock.pop())
+            card = opponent.pop(rng.randrange(len(opponent)))
+            pile.append(card)
+            tracker.discarded(card, by_opponent=True)
+            check(tracker, hand, pile, opponent, stock)
+            if not stock:
+                break
+
+            # Our turn: take or draw, sometimes meld a few cards, then discard.
+            if rng.random() < 0.4:
+                card = pile.pop()
+                tracker.we_take(card)
+            else:
+                card = stock.pop()
+                tracker.we_draw(card)
+            hand.append(card)
+            check(tracker, hand, pile, opponent, stock)
+            discard = hand.pop(rng.randrange(len(hand)))
+            pile.append(discard)
+            if len(hand) > 4 and rng.random() < 0.2:
+                for _ in range(3):
+                    hand.pop(rng.randrange(len(hand)))
+                tracker.laid_down(mask(hand), discard)
+            else:
+                tracker.discarded(discard, by_opponent=False)
+            check(tracker, hand, pile, opponent, stock)
+
+
+def test_laid_down_without_discard_marks_played_cards_dead():
+    tracker = CardTracker(cards_to_mask("2C 3C 4C 9H".split()))
+    tracker.laid_down(cards_to_mask(["9H"]))
+    assert tracker.dead == cards_to_mask("2C 3C 4C".split())
+    assert tracker.hand == cards_to_mask(["9H"])
+    assert tracker.discard == 0
+    assert tracker.unseen == FULL_DECK & ~cards_to_mask("2C 3C 4C 9H".split())
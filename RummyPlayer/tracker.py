@@ -0,0 +1,78 @@
+"""
+Per-game card knowledge, kept as 52-bit masks (cards.py encoding) and updated in O(1)
+per event by process_events() in main4.py.
+
+Every card is in exactly one of: our hand, the discard pile, known to be held by the
+opponent (taken from the discard and not thrown back), dead (melded out of play), or
+unseen (the stock plus whatever the opponent holds that we have not seen). Alongside,
+per-rank and per-suit interest scores summarize what the opponent has been collecting:
+taking a card raises its rank and suit, discarding one lowers them.
+"""
+from cards import CARD_BITS, FULL_DECK, NUM_RANKS
+
+TAKE_INTEREST = 2       # added to a card's rank and suit when the opponent takes it
+DISCARD_INTEREST = 1    # subtracted when the opponent discards it
+
+
+class CardTracker:
+    """
+    hand, discard, opponent, dead: card masks (see the module docstring).
+    rank_interest[rank], suit_interest[suit]: the opponent's interest scores.
+    All methods take card indices and cost a few bit operations.
+    """
+    __slots__ = ("hand", "discard", "opponent", "dead", "rank_interest", "suit_interest")
+
+    def __init__(self, hand=0):
+        self.hand = hand
+        self.discard = 0
+        self.opponent = 0
+        self.dead = 0
+        self.rank_interest = [0] * NUM_RANKS
+        self.suit_interest = [0] * 4
+
+    @property
+    def unseen(self):
+        return FULL_DECK & ~(self.hand | self.discard | self.opponent | self.dead)
+
+    def interest(self, card):
+        """
+        The opponent's interest in a card: its rank's score plus its suit's score.
+        """
+        return self.rank_interest[card % NUM_RANKS] + self.suit_interest[card // NUM_RANKS]
+
+    # -------------------- EVENTS --------------------
+
+    def we_draw(self, card):
+        self.hand |= CARD_BITS[card]
+
+    def we_take(self, card):
+        bit = CARD_BITS[card]
+        self.hand |= bit
+        self.discard &= ~bit
+
+    def opponent_takes(self, card):
+        bit = CARD_BITS[card]
+        self.opponent |= bit
+        self.discard &= ~bit
+        self.rank_interest[card % NUM_RANKS] += TAKE_INTEREST
+        self.suit_interest[card // NUM_RANKS] += TAKE_INTEREST
+
+    def discarded(self, card, by_opponent):
+        bit = CARD_BITS[card]
+        self.discard |= bit
+        self.hand &= ~bit
+        self.opponent &= ~bit
+        if by_opponent:
+            self.rank_interest[card % NUM_RANKS] -= DISCARD_INTEREST
+            self.suit_interest[card // NUM_RANKS] -= DISCARD_INTEREST
+
+    def laid_down(self, remaining, discard=None):
+        """
+        Our lay-down: cards that left the hand other than the discard are melded (dead).
+        """
+        played = self.hand & ~remaining
+        if discard is not None:
+            played &= ~CARD_BITS[discard]
+            self.discard |= CARD_BITS[discard]
+        self.dead |= played
+        self.hand = remaining
@@ -0,0 +1,99 @@
+"""
+Offline tuner for the evaluator weights (see evaluator.py).
+
+Coordinate search over self-play: each round perturbs every weight up and down, plays
+each candidate against the current weights over the same seeded deals in the arena's
+process pool, and adopts the candidate with the best net score if it also wins more
+hands. Each round uses fresh deals. The result is written to a versioned weights file
+that main4 loads at startup; nothing here runs inside the server.
+
+Run from the RummyPlayer directory, e.g.:
+    python tune.py --rounds 5 --games 400 --workers 4 --budget 0.005
+"""
+import argparse
+
+import arena
+from evaluator import WEIGHT_NAMES, load_weights, save_weights
+import main4
+
+# How far one step moves each weight.
+STEPS = {"gin_bonus": 50.0, "meld_bonus": 4.0, "discard_penalty": 0.5, "high_card_penalty": 4.0}
+
+
+def candidates(weights):
+    """
+    Yields (description, weights) for every one-weight step up or down from weights.
+    """
+    for name in WEIGHT_NAMES:
+        for sign in (1, -1):
+            value = weights[name] + sign * STEPS[name]
+            if value < 0:
+                continue
+            yield f"{name} {'+' if sign > 0 else '-'}{STEPS[name]:g}", dict(weights, **{name: value})
+
+
+def play_off(challenger, incumbent, spec, games, workers, seed, time_budget):
+    """
+    Challenger vs incumbent over `games` seeded hands. Returns (net score per hand for the
+    challenger, challenger wins, incumbent wins).
+    """
+    players = [dict(arena.parse_player(spec), weights=challenger),
+               dict(arena.parse_player(spec), weights=incumbent)]
+    summary = arena.run_arena(players, games, workers=workers, seed=seed, time_budget=time_budget)
+    net = (summary["scores"][0] - summary["scores"][1]) / games
+    return net, summary["wins"][0], summary["wins"][1]
+
+
+def tune(weights, rounds, games, workers, seed, time_budget, spec, min_gain):
+    """
+    Runs the coordinate search and returns (weights, rounds in which a candidate was adopted).
+    """
+    improved = 0
+    for round_number in range(rounds):
+        round_seed = seed + round_number * games
+        best = None
+        for label, candidate in candidates(weights):
+            net, wins, losses = play_off(candidate, weights, spec, games, workers, round_seed,
+                                         time_budget)
+            print(f"round {round_number + 1}: {label:28s} net {net:+7.2f}/hand  {wins}-{losses}")
+            if net > min_gain and wins > losses and (best is None or net > best[0]):
+                best = (net, label, candidate)
+        if best is None:
+            print(f"round {round_number + 1}: no candidate beat the current weights")
+            continue
+        improved += 1
+        weights = best[2]
+        print(f"round {round_number + 1}: adopted {best[1]} -> {weights}")
+    return weights, improved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit evaluator weights by self-play.")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--games", type=int, default=200, help="hands per candidate play-off")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=432)
+    parser.add_argument("--budget", type=float, default=0.005, help="MCTS seconds per lay-down")
+    parser.add_argument("--player", default="mcts:ev", help="lay_down_mode:draw_mode of both sides")
+    parser.add_argument("--min-gain", type=float, default=0.5, help="net points per hand to adopt")
+    parser.add_argument("--start", help="weights file to start from (default: --out, else defaults)")
+    parser.add_argument("--out", default=main4.WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    start, version = load_weights(args.start or args.out)
+    if args.start:
+        _, version = load_weights(args.out)
+    print(f"starting from v{version}: {start}")
+    weights, improved = tune(start, args.rounds, args.games, args.workers, args.seed,
+                             args.budget, args.player, args.min_gain)
+    if not improved:
+        print("weights unchanged, nothing written")
+        return
+    save_weights(args.out, weights, version + 1, parent_version=version, rounds=args.rounds,
+                 games_per_candidate=args.games, player=args.player, budget=args.budget,
+                 seed=args.seed)
+    print(f"wrote {args.out} v{version + 1}: {weights}")
+
+
+if __name__ == "__main__":
+    main()